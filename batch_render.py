@@ -0,0 +1,189 @@
+"""
+Пакетная отрисовка карт риска и зон поражающих факторов для всех планов базы.
+
+Работает без графического интерфейса: для каждого плана из базы берутся
+объекты и сохраненный масштаб, карты рассчитываются в пуле процессов
+(по плану на процесс) и сохраняются в каталог результатов:
+
+    <id>_<имя>_risk.png     - раскрашенная карта риска (RGBA) + world-файл .pgw
+    <id>_<имя>_risk.tif     - значения риска float32 + world-файл .tfw
+    <id>_<имя>_impact.png   - зоны поражающих факторов (RGBA) + world-файл .pgw
+
+Запуск:
+    python batch_render.py plans.db -o maps
+    python batch_render.py plans.db -o maps --cell-size 0.5 --workers 4
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from iris_core.image_io import stream_image_size, write_png, write_tiff, write_world_file
+from iris_core.impact_zones import impact_zones_image
+from iris_core.risk_decay import DECAY_FUNCTIONS
+from iris_core.risk_map import compute_risk_map, risk_image
+from iris_core.risk_raster import DISTANCE_ENGINES, DEFAULT_UPSAMPLING, UPSAMPLING_METHODS
+from iris_db.database import DatabaseManager
+
+LAYERS = ('risk', 'impact')
+
+
+def output_stem(image_id: int, file_name: str) -> str:
+    """Префикс имен файлов результатов плана"""
+    name = re.sub(r'[^\w\-]+', '_', Path(file_name).stem).strip('_')
+    return f"{image_id}_{name}" if name else str(image_id)
+
+
+def read_plan_size(db: DatabaseManager, image_id: int) -> tuple:
+    """Размер изображения плана по заголовку, без чтения BLOB целиком"""
+    if not hasattr(db.conn, 'blobopen'):
+        # Инкрементальное чтение BLOB появилось в Python 3.11
+        return stream_image_size(io.BytesIO(db.images.get_image_data(image_id) or b""))
+    blob = db.images.open_image_data(image_id)
+    if blob is None:
+        raise ValueError(f"Нет данных изображения плана {image_id}")
+    with blob:
+        return stream_image_size(blob)
+
+
+def render_plan(db_path: str, image_id: int, output_dir: str, options: dict) -> dict:
+    """
+    Рассчитывает и сохраняет карты одного плана
+
+    Выполняется в отдельном процессе, поэтому открывает собственное
+    подключение к базе данных.
+
+    Returns:
+        dict: id плана, список записанных файлов и время расчета
+    """
+    start = time.time()
+    with DatabaseManager(db_path) as db:
+        image = db.images.get_summary(image_id)
+        if image is None:
+            raise ValueError(f"План {image_id} не найден")
+        # Из данных изображения нужен только размер - читаем заголовок
+        width, height = read_plan_size(db, image_id)
+        objects = db.objects.get_by_image_id(image_id)
+
+    # Масштаб, сохраненный калибровкой в приложении; у неоткалиброванного
+    # плана его нет, и карты в метрах построить нельзя
+    scale = options['scale'] or image.scale
+    if not scale or scale <= 0:
+        raise ValueError("Масштаб плана не задан: откалибруйте план в приложении "
+                         "или укажите --scale")
+
+    stem = output_stem(image.id, image.file_name)
+    output_dir = Path(output_dir)
+    files = []
+
+    if 'risk' in options['layers'] and objects:
+        risk = compute_risk_map(
+            objects, width, height, scale,
+            decay=options['decay'],
+            cell_size=options['cell_size'],
+            engine=options['engine'],
+            max_workers=1
+        )
+        values = risk.to_plan(options['upsampling'])
+
+        png_path = output_dir / f"{stem}_risk.png"
+        write_png(png_path, risk_image(values)[..., [2, 1, 0, 3]])
+        files += [png_path, write_world_file(png_path, scale)]
+
+        tif_path = output_dir / f"{stem}_risk.tif"
+        write_tiff(tif_path, values)
+        files += [tif_path, write_world_file(tif_path, scale)]
+
+    if 'impact' in options['layers'] and objects:
+        png_path = output_dir / f"{stem}_impact.png"
+        image_bgra = impact_zones_image(objects, width, height, scale)
+        write_png(png_path, image_bgra[..., [2, 1, 0, 3]])
+        files += [png_path, write_world_file(png_path, scale)]
+
+    return {
+        'id': image.id,
+        'file_name': image.file_name,
+        'files': [str(path) for path in files],
+        'time': time.time() - start,
+    }
+
+
+def render_database(db_path: str, output_dir: str, options: dict, workers: int = None) -> int:
+    """
+    Отрисовывает все планы базы в пуле процессов
+
+    Returns:
+        int: число планов, которые не удалось обработать
+    """
+    with DatabaseManager(db_path) as db:
+        images = db.images.get_summaries()
+    if options['plans']:
+        images = [image for image in images if image.id in options['plans']]
+    print(f"Планов к обработке: {len(images)}")
+
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(render_plan, db_path, image.id, output_dir, options): image
+            for image in images
+        }
+        for future in as_completed(futures):
+            image = futures[future]
+            try:
+                result = future.result()
+                print(f"[{image.id}] {image.file_name}: {len(result['files'])} файлов, "
+                      f"{result['time']:.2f} с")
+            except Exception as e:
+                failed += 1
+                print(f"[{image.id}] {image.file_name}: ошибка - {str(e)}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Пакетная отрисовка карт риска и зон поражающих факторов"
+    )
+    parser.add_argument('database', help="файл базы данных (.db)")
+    parser.add_argument('-o', '--output', default='maps', help="каталог результатов")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="число процессов, по умолчанию по числу ядер")
+    parser.add_argument('--layers', nargs='+', choices=LAYERS, default=list(LAYERS),
+                        help="какие карты строить")
+    parser.add_argument('--plans', nargs='+', type=int, help="обработать только планы с этими id")
+    parser.add_argument('--scale', type=float,
+                        help="масштаб (метров в пикселе) вместо сохраненного в базе")
+    parser.add_argument('--cell-size', type=float, help="размер ячейки сетки риска в метрах")
+    parser.add_argument('--upsampling', choices=UPSAMPLING_METHODS, default=DEFAULT_UPSAMPLING,
+                        help="масштабирование сетки риска до размеров плана")
+    parser.add_argument('--decay', choices=sorted(DECAY_FUNCTIONS), default='stepwise',
+                        help="функция убывания силы воздействия")
+    parser.add_argument('--engine', choices=sorted(DISTANCE_ENGINES), default='numpy',
+                        help="способ расчета расстояний")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"Файл базы данных не найден: {args.database}")
+        return 2
+
+    options = {
+        'layers': args.layers,
+        'plans': set(args.plans) if args.plans else None,
+        'scale': args.scale,
+        'cell_size': args.cell_size,
+        'upsampling': args.upsampling,
+        'decay': args.decay,
+        'engine': args.engine,
+    }
+    start = time.time()
+    failed = render_database(args.database, args.output, options, args.workers)
+    print(f"Готово за {time.time() - start:.2f} с, ошибок: {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
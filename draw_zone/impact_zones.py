@@ -1,9 +1,9 @@
 from PySide6.QtWidgets import QGraphicsScene, QGraphicsPixmapItem
-from PySide6.QtGui import QPixmap, QPainter, QColor, QImage
-from PySide6.QtCore import Qt
 
-from iris_db.database import DatabaseManager
+from draw_zone.qt_image import pixmap_from_array
+from iris_core.impact_zones import impact_zones_image
 from iris_db.models import Object, ObjectType
+from iris_db.database import DatabaseManager
 
 
 class ImpactZoneRenderer:
@@ -11,15 +11,6 @@ class ImpactZoneRenderer:
 
     def __init__(self, scene: QGraphicsScene):
         self.scene = scene
-        # Цвета для каждой зоны без прозрачности
-        self.zone_colors = {
-            'R6': QColor(255, 255, 0),  # Желтый
-            'R5': QColor(128, 0, 128),  # Фиолетовый
-            'R4': QColor(0, 255, 0),  # Зеленый
-            'R3': QColor(255, 165, 0),  # Оранжевый
-            'R2': QColor(0, 0, 255),  # Синий
-            'R1': QColor(255, 0, 0)  # Красный
-        }
 
     def render_impact_zones(self, obj: Object, scale: float) -> QGraphicsPixmapItem:
         """
@@ -40,47 +31,11 @@ class ImpactZoneRenderer:
         width = int(scene_rect.width())
         height = int(scene_rect.height())
 
-        # Создаем белое изображение
-        image = QImage(width, height, QImage.Format_ARGB32)
-        image.fill(Qt.white)
-
-        # Создаем художника для рисования
-        painter = QPainter(image)
-        painter.setRenderHint(QPainter.Antialiasing)
-
-        # Получаем координаты центра объекта
-        center_x = obj.coordinates[0].x
-        center_y = obj.coordinates[0].y
-
-        # Рисуем круги для каждой зоны (от большей к меньшей)
-        zones = ['R6', 'R5', 'R4', 'R3', 'R2', 'R1']
-        for zone in zones:
-            radius = getattr(obj, zone)  # Получаем радиус из объекта
-            radius_px = radius / scale
-
-            # Устанавливаем цвет для зоны
-            painter.setBrush(self.zone_colors[zone])
-            painter.setPen(Qt.NoPen)
-
-            # Рисуем круг
-            painter.drawEllipse(
-                center_x - radius_px,
-                center_y - radius_px,
-                radius_px * 2,
-                radius_px * 2
-            )
-
-        painter.end()
-
-        # Создаем QPixmap из изображения
-        pixmap = QPixmap.fromImage(image)
-
-        # Удаляем белые пиксели одной маской
-        mask = pixmap.createMaskFromColor(QColor(255, 255, 255))
-        pixmap.setMask(mask)
+        # Растр зон рассчитывается в iris_core, вне зон пиксели прозрачные
+        image = impact_zones_image([obj], width, height, scale)
 
         # Создаем элемент сцены с прозрачностью
-        item = QGraphicsPixmapItem(pixmap)
+        item = QGraphicsPixmapItem(pixmap_from_array(image))
         item.setOpacity(0.4)
 
         return item
@@ -1,6 +1,7 @@
 from PySide6.QtWidgets import QGraphicsScene, QGraphicsPixmapItem
-from PySide6.QtGui import QPixmap, QPainter, QColor, QImage, QPen, QPainterPath
-from PySide6.QtCore import Qt, QPointF
+
+from draw_zone.qt_image import pixmap_from_array
+from iris_core.impact_zones import impact_zones_image
 from iris_db.models import Object, ObjectType
 from iris_db.database import DatabaseManager
 
@@ -10,15 +11,6 @@ class LinearImpactRenderer:
 
     def __init__(self, scene: QGraphicsScene):
         self.scene = scene
-        # Цвета для каждой зоны без прозрачности
-        self.zone_colors = {
-            'R6': QColor(255, 255, 0),  # Желтый
-            'R5': QColor(128, 0, 128),  # Фиолетовый
-            'R4': QColor(0, 255, 0),  # Зеленый
-            'R3': QColor(255, 165, 0),  # Оранжевый
-            'R2': QColor(0, 0, 255),  # Синий
-            'R1': QColor(255, 0, 0)  # Красный
-        }
 
     def render_impact_zones(self, obj: Object, scale: float) -> QGraphicsPixmapItem:
         """
@@ -32,50 +24,11 @@ class LinearImpactRenderer:
         width = int(scene_rect.width())
         height = int(scene_rect.height())
 
-        # Создаем белое изображение
-        image = QImage(width, height, QImage.Format_ARGB32)
-        image.fill(Qt.white)
-
-        # Создаем художника для рисования
-        painter = QPainter(image)
-        painter.setRenderHint(QPainter.Antialiasing)
-
-        # Создаем путь из координат объекта
-        path = QPainterPath()
-        first_coord = obj.coordinates[0]
-        path.moveTo(first_coord.x, first_coord.y)
-
-        for coord in obj.coordinates[1:]:
-            path.lineTo(coord.x, coord.y)
-
-        # Рисуем линии для каждой зоны (от большей к меньшей)
-        zones = ['R6', 'R5', 'R4', 'R3', 'R2', 'R1']
-        for zone in zones:
-            radius = getattr(obj, zone)  # Получаем радиус из объекта
-            # Переводим радиус из метров в пиксели
-            width_px = radius / scale
-
-            # Настраиваем перо для рисования
-            pen = QPen(self.zone_colors[zone])
-            pen.setWidth(int(width_px * 2))  # Ширина линии равна диаметру зоны
-            pen.setCapStyle(Qt.RoundCap)  # Закругленные концы
-            pen.setJoinStyle(Qt.RoundJoin)  # Закругленные соединения
-
-            painter.setPen(pen)
-            painter.setBrush(Qt.NoBrush)
-            painter.drawPath(path)
-
-        painter.end()
-
-        # Создаем QPixmap из изображения
-        pixmap = QPixmap.fromImage(image)
-
-        # Удаляем белые пиксели одной маской
-        mask = pixmap.createMaskFromColor(QColor(255, 255, 255))
-        pixmap.setMask(mask)
+        # Растр зон рассчитывается в iris_core, вне зон пиксели прозрачные
+        image = impact_zones_image([obj], width, height, scale)
 
         # Создаем элемент сцены с прозрачностью
-        item = QGraphicsPixmapItem(pixmap)
+        item = QGraphicsPixmapItem(pixmap_from_array(image))
         item.setOpacity(0.4)
 
         return item
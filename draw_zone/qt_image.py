@@ -0,0 +1,14 @@
+"""
+Преобразование изображений iris_core в объекты Qt.
+"""
+import numpy as np
+from PySide6.QtGui import QImage, QPixmap
+
+
+def pixmap_from_array(im: np.ndarray) -> QPixmap:
+    """Создает QPixmap из массива (H, W, 4) uint8 с порядком байтов BGRA"""
+    im = np.ascontiguousarray(im)
+    h, w, _ = im.shape
+    image = QImage(im.data, w, h, 4 * w, QImage.Format_ARGB32)
+    # fromImage копирует данные, поэтому массив можно освободить
+    return QPixmap.fromImage(image)
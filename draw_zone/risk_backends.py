@@ -0,0 +1,228 @@
+"""
+Бэкенды выполнения расчета риска.
+
+ThreadRiskBackend выполняет расчет объектов в QThreadPool,
+ProcessRiskBackend - в пуле процессов, что позволяет загрузить все ядра
+без оглядки на GIL. Бэкенд получает объекты, сериализованные функцией
+risk_task, запускает расчет без блокировки интерфейса и прибавляет готовые
+плитки к общему HeatmapAccumulator.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PySide6.QtCore import QObject, Signal, QRunnable, QThreadPool, QTimer
+
+from iris_core.risk_raster import (HeatmapAccumulator, SharedRiskTile, task_window,
+                                   compute_risk_tile, compute_risk_tile_shared)
+
+
+class WorkerSignals(QObject):
+    finished = Signal()
+    error = Signal(str)
+    result = Signal(object)
+
+
+class RadiationWorker(QRunnable):
+    def __init__(self, width: int, height: int, object_in_table: dict, scale_plan: float,
+                 blurring: int, accumulator: HeatmapAccumulator = None):
+        super().__init__()
+        self.signals = WorkerSignals()
+        self.width = width
+        self.height = height
+        self.object_in_table = object_in_table
+        self.scale_plan = scale_plan
+        self.blurring = blurring
+        # Если задан накопитель, плитка прибавляется к нему прямо в этом потоке
+        self.accumulator = accumulator
+        print(f"RadiationWorker initialized with dimensions: {width}x{height}")  # Debug print
+
+    def run(self):
+        try:
+            print(f"Starting calculations for object {self.object_in_table['name']}")  # Debug print
+
+            # Считаем расстояния только в окне, где объект может дать ненулевой вклад
+            tile = compute_risk_tile(self.object_in_table, self.width, self.height,
+                                     self.scale_plan)
+            if self.accumulator is not None:
+                self.accumulator.add(tile)
+
+            print("Calculations completed successfully")  # Debug print
+
+        except Exception as e:
+            print(f"Error in calculations: {str(e)}")  # Debug print
+            self.signals.error.emit(str(e))
+            return
+
+        # Плитка передается по ссылке, массив через сигнал не копируется
+        self.signals.result.emit(tile)
+        self.signals.finished.emit()
+
+
+class ThreadRiskBackend:
+    """Расчет в пуле потоков Qt"""
+
+    def __init__(self):
+        self.thread_pool = QThreadPool()
+        # Сигналы worker'ов храним до конца расчета, иначе они удаляются
+        # вместе с QRunnable и результаты из очереди теряются
+        self.signals = []
+
+    def start(self, tasks: list, width: int, height: int, scale_plan: float,
+              accumulator: HeatmapAccumulator, on_complete, on_error) -> None:
+        """
+        Запускает расчет и сразу возвращает управление
+
+        Args:
+            tasks: объекты, сериализованные функцией risk_task
+            width: ширина плана
+            height: высота плана
+            scale_plan: масштаб плана (метров в пикселе)
+            accumulator: карта, в которую прибавляются плитки объектов
+            on_complete: вызывается с задачей и ее плиткой по завершении расчета
+                объекта; плитка уже прибавлена к accumulator
+            on_error: вызывается с задачей и текстом ошибки
+        """
+        self.signals = []
+        for task in tasks:
+            worker = RadiationWorker(width, height, task, scale_plan, blurring=1,
+                                     accumulator=accumulator)
+            worker.signals.result.connect(
+                lambda tile, task=task: on_complete(task, tile)
+            )
+            worker.signals.error.connect(
+                lambda message, task=task: on_error(task, message)
+            )
+            self.signals.append(worker.signals)
+            self.thread_pool.start(worker)
+
+    def cancel(self) -> None:
+        """
+        Снимает с очереди еще не начатые расчеты и сразу возвращает управление
+
+        Уже запущенные worker'ы дорабатывают в фоне; их результаты отбрасывает
+        калькулятор, для которого расчет уже не выполняется.
+        """
+        self.thread_pool.clear()
+        self.release()
+
+    def release(self, wait: bool = False) -> None:
+        """
+        Освобождает ресурсы после завершения расчета
+
+        Args:
+            wait: дождаться завершения уже запущенных worker'ов
+        """
+        if wait:
+            self.thread_pool.waitForDone()
+        self.signals.clear()
+
+
+class ProcessRiskBackend:
+    """
+    Расчет в пуле процессов
+
+    Объекты передаются процессам как словари с массивами координат,
+    результаты возвращаются через разделяемую память. Готовность задач
+    проверяется по таймеру в потоке интерфейса.
+    """
+
+    POLL_INTERVAL_MS = 50
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.executor = None
+        self.queue = []
+        self.pending = {}
+        self.timer = QTimer()
+        self.timer.setInterval(self.POLL_INTERVAL_MS)
+        self.timer.timeout.connect(self._poll)
+
+    def start(self, tasks: list, width: int, height: int, scale_plan: float,
+              accumulator: HeatmapAccumulator, on_complete, on_error) -> None:
+        """Запускает расчет и сразу возвращает управление"""
+        self.width = width
+        self.height = height
+        self.scale_plan = scale_plan
+        self.accumulator = accumulator
+        self.on_complete = on_complete
+        self.on_error = on_error
+        self.queue = list(tasks)
+        self.pending = {}
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        # Таймер запускается до отправки задач: если все объекты за пределами
+        # плана, расчет завершается прямо в _submit, и release() его остановит
+        self.timer.start()
+        self._submit()
+
+    def _submit(self) -> None:
+        """Отправляет задачи в пул, ограничивая число выделенных блоков памяти"""
+        while self.queue and len(self.pending) < self.max_workers * 2:
+            task = self.queue.pop(0)
+            window = task_window(task, self.width, self.height, self.scale_plan)
+            if window[0] == window[2] or window[1] == window[3]:
+                # Объект целиком за пределами плана, плитка пустая
+                tile = compute_risk_tile(task, self.width, self.height, self.scale_plan)
+                self.accumulator.add(tile)
+                self.on_complete(task, tile)
+                continue
+            tile = SharedRiskTile(window)
+            future = self.executor.submit(
+                compute_risk_tile_shared, task, self.width, self.height,
+                self.scale_plan, tile.name
+            )
+            self.pending[future] = (task, tile)
+
+    def _poll(self) -> None:
+        """Забирает готовые результаты и дополняет очередь пула"""
+        for future in [f for f in self.pending if f.done()]:
+            task, tile = self.pending.pop(future)
+            try:
+                future.result()
+                self.accumulator.add(tile)
+                self.on_complete(task, tile)
+            except Exception as e:
+                print(f"Error in calculations: {str(e)}")  # Debug print
+                self.on_error(task, str(e))
+            finally:
+                tile.release()
+
+        if self.executor is None:
+            return
+        self._submit()
+        if not self.queue and not self.pending:
+            # Все задачи готовы: опрашивать больше нечего, пул освобождает
+            # release() вызывающей стороны
+            self.timer.stop()
+
+    def cancel(self) -> None:
+        """Останавливает пул и отменяет еще не начатые задачи"""
+        self.queue = []
+        self.release()
+
+    def release(self, wait: bool = False) -> None:
+        """
+        Освобождает пул процессов и блоки разделяемой памяти
+
+        Args:
+            wait: дождаться завершения процессов пула
+        """
+        self.timer.stop()
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait, cancel_futures=True)
+            self.executor = None
+        for _, tile in self.pending.values():
+            tile.release()
+        self.pending = {}
+
+
+BACKENDS = {
+    'thread': ThreadRiskBackend,
+    'process': ProcessRiskBackend,
+}
+
+
+def create_backend(name: str):
+    """Создает бэкенд расчета риска по имени ('thread' или 'process')"""
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд расчета риска: {name}")
+    return BACKENDS[name]()
@@ -0,0 +1,285 @@
+"""
+Нагрузочный тест расчета риска на синтетических планах.
+
+Генерирует планы с заданным размером, числом объектов, соотношением типов,
+числом вершин и радиусом R6, рассчитывает карту риска каждым бэкендом без
+графического интерфейса и выводит время расчета, пиковый объем памяти
+(RSS) основного процесса и самого большого из процессов пула и число
+обсчитанных пикселей в секунду. Каждый замер выполняется в отдельном
+процессе, чтобы пиковая память не накапливалась между замерами.
+
+Запуск:
+    python -m draw_zone.risk_benchmark --output baseline.json
+    python -m draw_zone.risk_benchmark --compare baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from iris_db.models import Object, ObjectType, Coordinate
+
+# Базовый случай; остальные случаи меняют в нем по одному параметру
+BASE_CASE = {
+    'width': 2000,
+    'height': 1500,
+    'scale': 0.5,
+    'objects': 20,
+    'mix': {'point': 1, 'linear': 1, 'stationary': 1},
+    'vertices': 8,
+    'R6': 50.0,
+    'seed': 1,
+}
+
+CASES = [
+    ('base', {}),
+    ('plan_4000x3000', {'width': 4000, 'height': 3000}),
+    ('objects_100', {'objects': 100}),
+    ('points_only', {'mix': {'point': 1, 'linear': 0, 'stationary': 0}}),
+    ('linear_only', {'mix': {'point': 0, 'linear': 1, 'stationary': 0}}),
+    ('stationary_only', {'mix': {'point': 0, 'linear': 0, 'stationary': 1}}),
+    ('vertices_64', {'vertices': 64}),
+    ('R6_200', {'R6': 200.0}),
+]
+
+# Бэкенд выполнения и способ расчета расстояний
+BACKENDS = [
+    ('thread', 'numpy'),
+    ('thread', 'shapely'),
+    ('process', 'numpy'),
+    ('process', 'shapely'),
+]
+
+# Замедление относительно базовой линии, которое считается регрессией
+DEFAULT_TOLERANCE = 0.25
+
+
+def synthetic_objects(case: dict) -> list:
+    """
+    Генерирует объекты плана для случая нагрузочного теста
+
+    Линейные объекты - случайные ломаные, стационарные - звездчатые
+    многоугольники вокруг случайного центра. Генерация детерминирована
+    параметром seed.
+    """
+    rng = np.random.default_rng(case['seed'])
+    width, height = case['width'], case['height']
+    types = [t for t in ('point', 'linear', 'stationary') for _ in range(case['mix'].get(t, 0))]
+    step = min(width, height) / 20
+    R6 = case['R6']
+
+    objects = []
+    for i in range(case['objects']):
+        object_type = types[i % len(types)]
+        center = rng.uniform((0, 0), (width, height))
+        if object_type == 'point':
+            coords = center[np.newaxis, :]
+        elif object_type == 'linear':
+            steps = rng.normal(0, step, (case['vertices'] - 1, 2))
+            coords = np.vstack([center, center + np.cumsum(steps, axis=0)])
+        else:
+            angles = np.sort(rng.uniform(0, 2 * np.pi, case['vertices']))
+            radii = rng.uniform(step / 2, step * 2, case['vertices'])
+            coords = center + np.column_stack([radii * np.cos(angles), radii * np.sin(angles)])
+            coords = np.vstack([coords, coords[:1]])
+        coords = np.clip(coords, 0, (width - 1, height - 1))
+
+        objects.append(Object(
+            id=i + 1,
+            image_id=1,
+            name=f"{object_type}_{i + 1}",
+            R1=R6 / 6, R2=R6 / 3, R3=R6 / 2, R4=R6 * 2 / 3, R5=R6 * 5 / 6, R6=R6,
+            object_type=ObjectType(object_type),
+            coordinates=[Coordinate(None, i + 1, float(x), float(y), k)
+                         for k, (x, y) in enumerate(coords)]
+        ))
+    return objects
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """
+    Пиковый объем памяти в МБ
+
+    Args:
+        children: False - текущего процесса, True - самого большого из
+            завершенных дочерних процессов (ОС не суммирует их память)
+    """
+    try:
+        import resource
+    except ImportError:
+        # В Windows модуля resource нет
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    usage = resource.getrusage(who).ru_maxrss
+    # В macOS ru_maxrss в байтах, в Linux - в килобайтах
+    divider = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return usage / divider
+
+
+def run_case(case: dict, backend_name: str, engine: str) -> dict:
+    """Выполняет один замер в текущем процессе"""
+    from PySide6.QtCore import QCoreApplication, QEventLoop
+    from draw_zone.risk_backends import create_backend
+    from iris_core.risk_raster import HeatmapAccumulator, risk_task, task_window
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    width, height, scale = case['width'], case['height'], case['scale']
+    tasks = [risk_task(obj, engine=engine) for obj in synthetic_objects(case)]
+    pixels = 0
+    for task in tasks:
+        x_min, y_min, x_max, y_max = task_window(task, width, height, scale)
+        pixels += (x_max - x_min) * (y_max - y_min)
+
+    accumulator = HeatmapAccumulator(width, height)
+    backend = create_backend(backend_name)
+    loop = QEventLoop()
+    state = {'done': 0, 'errors': 0}
+
+    def on_complete(task, tile):
+        state['done'] += 1
+        if state['done'] == len(tasks):
+            loop.quit()
+
+    def on_error(task, message):
+        state['errors'] += 1
+        on_complete(task, None)
+
+    # Отладочный вывод worker'ов не должен искажать замер
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        backend.start(tasks, width, height, scale, accumulator, on_complete, on_error)
+        if state['done'] < len(tasks):
+            loop.exec()
+        wall_time = time.perf_counter() - start
+        # Память дочерних процессов учитывается только после их завершения
+        backend.release(wait=True)
+
+    return {
+        'wall_time': wall_time,
+        'peak_rss_mb': peak_rss_mb(),
+        'children_peak_rss_mb': peak_rss_mb(children=True),
+        'pixels': pixels,
+        'pixels_per_second': pixels / wall_time if wall_time > 0 else None,
+        'errors': state['errors'],
+        'checksum': float(accumulator.values.sum()),
+    }
+
+
+def measure(case: dict, backend_name: str, engine: str, repeat: int) -> dict:
+    """
+    Выполняет замер в отдельных процессах и возвращает лучший результат
+    по времени из repeat запусков
+    """
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-m', 'draw_zone.risk_benchmark', '--run-case',
+             json.dumps({'case': case, 'backend': backend_name, 'engine': engine})],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result['wall_time'] < best['wall_time']:
+            best = result
+    return best
+
+
+def format_rss(value) -> str:
+    return f"{value:.0f} MB" if value is not None else "n/a"
+
+
+def run_benchmark(repeat: int = 1, cases: list = None) -> dict:
+    """Выполняет все замеры и возвращает отчет"""
+    report = {
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'results': {},
+    }
+    for name, changes in CASES:
+        if cases and name not in cases:
+            continue
+        case = {**BASE_CASE, **changes}
+        for backend_name, engine in BACKENDS:
+            key = f"{name}/{backend_name}/{engine}"
+            result = measure(case, backend_name, engine, repeat)
+            result['case'] = case
+            report['results'][key] = result
+            rss = format_rss(result['peak_rss_mb'])
+            children_rss = format_rss(result['children_peak_rss_mb'])
+            print(f"{key:40s} {result['wall_time']:8.3f} s  main {rss:>8s}  "
+                  f"worker {children_rss:>8s}  {result['pixels_per_second'] / 1e6:8.2f} Mpx/s")
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> tuple:
+    """
+    Сравнивает отчет с базовой линией
+
+    Returns:
+        tuple: (regressions, mismatches) - замеры, которые замедлились больше
+            чем на tolerance, и замеры, результат расчета которых изменился
+    """
+    regressions = []
+    mismatches = []
+    for key, result in report['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        ratio = result['wall_time'] / base['wall_time']
+        status = "REGRESSION" if ratio > 1 + tolerance else "ok"
+        print(f"{key:40s} {base['wall_time']:8.3f} -> {result['wall_time']:8.3f} s  x{ratio:.2f}  {status}")
+        if abs(result['checksum'] - base['checksum']) > 1e-6 * max(abs(base['checksum']), 1):
+            print(f"{key:40s} результат расчета отличается от базовой линии")
+            mismatches.append(key)
+        if ratio > 1 + tolerance:
+            regressions.append(key)
+    return regressions, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест расчета риска")
+    parser.add_argument('--output', help="сохранить отчет в JSON-файл")
+    parser.add_argument('--compare', help="сравнить с базовой линией из JSON-файла")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="допустимое замедление относительно базовой линии")
+    parser.add_argument('--repeat', type=int, default=1, help="число повторов замера")
+    parser.add_argument('--case', action='append', help="выполнить только указанные случаи")
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        params = json.loads(args.run_case)
+        print(json.dumps(run_case(params['case'], params['backend'], params['engine'])))
+        return 0
+
+    report = run_benchmark(args.repeat, args.case)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Отчет сохранен: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions, mismatches = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"Замедление больше {args.tolerance:.0%}: {', '.join(regressions)}")
+        if mismatches:
+            print(f"Результат расчета изменился: {', '.join(mismatches)}")
+        if regressions or mismatches:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
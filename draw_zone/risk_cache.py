@@ -0,0 +1,73 @@
+"""
+Постоянный кэш вклада объектов в карту риска.
+
+Плитки хранятся сжатыми в таблице risk_cache той же базы данных, по одной
+записи на объект. Ключ записи - хэш координат, R1-R6, размеров плана и
+масштаба, поэтому после правки одного объекта пересчитывается только он.
+Записи с устаревшим ключом удаляются при загрузке, записи удаленных
+объектов - каскадно вместе с объектами.
+"""
+from iris_db.database import DatabaseManager
+from iris_db.models import RiskCacheEntry
+from iris_core.risk_raster import RiskTile, risk_cache_key
+
+
+class RiskTileCache:
+    def __init__(self, db_path: str, image_id: int):
+        self.db_path = db_path
+        self.image_id = image_id
+        self.pending = []
+
+    def load(self, tasks: list, width: int, height: int, scale_plan: float) -> dict:
+        """
+        Возвращает плитки из кэша для задач с актуальным ключом
+
+        Returns:
+            dict: id объекта -> RiskTile
+        """
+        keys = {
+            task['id']: risk_cache_key(task, width, height, scale_plan)
+            for task in tasks if task['id'] is not None
+        }
+
+        with DatabaseManager(self.db_path) as db:
+            entries = db.risk_cache.get_by_image_id(self.image_id)
+
+            tiles = {}
+            stale = []
+            for entry in entries:
+                if keys.get(entry.object_id) == entry.cache_key:
+                    tiles[entry.object_id] = RiskTile.decode(
+                        entry.x, entry.y, entry.width, entry.height, entry.data
+                    )
+                else:
+                    stale.append(entry.object_id)
+
+            if stale:
+                db.risk_cache.delete_many(stale)
+
+        print(f"Risk cache: {len(tiles)} hits, {len(stale)} stale entries evicted")
+        return tiles
+
+    def store(self, task: dict, tile, width: int, height: int, scale_plan: float) -> None:
+        """Запоминает плитку рассчитанного объекта до вызова flush()"""
+        if task['id'] is None:
+            return
+        self.pending.append(RiskCacheEntry(
+            object_id=task['id'],
+            cache_key=risk_cache_key(task, width, height, scale_plan),
+            x=tile.x,
+            y=tile.y,
+            width=tile.width,
+            height=tile.height,
+            data=tile.encode()
+        ))
+
+    def flush(self) -> None:
+        """Записывает накопленные плитки в базу данных одной транзакцией"""
+        if not self.pending:
+            return
+        with DatabaseManager(self.db_path) as db:
+            db.risk_cache.save_many(self.pending)
+        print(f"Risk cache: {len(self.pending)} entries saved")
+        self.pending = []
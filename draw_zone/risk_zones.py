@@ -1,306 +1,266 @@
 import time
 
-from PySide6.QtWidgets import QGraphicsPixmapItem, QApplication
-from PySide6.QtGui import QImage, QPixmap
-from PySide6.QtCore import Qt, QObject, Signal, QRunnable, QThreadPool
+from PySide6.QtWidgets import QGraphicsPixmapItem, QWidget, QHBoxLayout, QProgressBar, QPushButton
+from PySide6.QtCore import QObject, Signal, QTimer, QEventLoop
 import numpy as np
-from shapely.geometry import Point, LineString, Polygon
-from iris_db.models import ObjectType
+from draw_zone.risk_backends import create_backend
+from draw_zone.qt_image import pixmap_from_array
+from iris_core.risk_raster import HeatmapAccumulator, RiskGrid, DEFAULT_UPSAMPLING
+from iris_core.risk_map import risk_tasks, risk_image
+from draw_zone.risk_cache import RiskTileCache
 from iris_db.database import DatabaseManager
 
-# Используем те же константы, что и в example_heatmap.py
-PALETTE = np.array([
-    [255, 255, 255, 255], [0, 50, 255, 255], [0, 100, 255, 255],
-    [0, 120, 255, 255], [0, 140, 255, 255], [0, 160, 255, 255],
-    [0, 190, 255, 255], [0, 210, 255, 255], [0, 220, 255, 255],
-    [0, 255, 255, 255], [100, 255, 255, 255], [130, 255, 0, 255],
-    [150, 255, 0, 255], [180, 255, 0, 255], [200, 255, 0, 255],
-    [220, 255, 0, 255], [230, 255, 0, 255], [240, 255, 0, 255],
-    [255, 255, 0, 255], [255, 230, 0, 255], [255, 210, 0, 255],
-    [255, 200, 0, 255], [255, 190, 0, 255], [255, 170, 0, 255],
-    [255, 150, 0, 255], [255, 120, 0, 255], [255, 80, 0, 255],
-    [255, 60, 0, 255], [255, 30, 0, 255], [255, 0, 0, 255]
-], dtype='uint8')
-PALETTE[:, [0, 2]] = PALETTE[:, [2, 0]]  # Swap R and B channels
-
-SEARCH_STEPS = [100, 20, 5, 1]
-
-
-class WorkerSignals(QObject):
-    finished = Signal()
-    error = Signal(str)
-    result = Signal(object)
-
-
-class RadiationWorker(QRunnable):
-    def __init__(self, width: int, height: int, object_in_table: dict, scale_plan: float,
-                 blurring: int):
+class RiskCalculator(QObject):
+    """
+    Расчет карты риска для списка объектов
+
+    start() запускает расчет без блокировки интерфейса. По мере готовности
+    объектов испускаются progress и preview, по окончании - finished с
+    итоговым изображением. cancel() прерывает расчет.
+    """
+
+    # Число готовых объектов, общее число объектов, имя последнего объекта
+    progress = Signal(int, int, str)
+    # Промежуточное изображение карты риска
+    preview = Signal(object)
+    # Итоговое изображение карты риска
+    finished = Signal(object)
+    cancelled = Signal()
+
+    # Не чаще одного обновления предпросмотра за этот интервал
+    PREVIEW_INTERVAL_MS = 500
+
+    def __init__(self, main_window, backend: str = 'thread', cache: RiskTileCache = None,
+                 decay: str = 'stepwise', cell_size: float = None, upsampling: str = DEFAULT_UPSAMPLING,
+                 engine: str = 'numpy'):
         super().__init__()
-        self.signals = WorkerSignals()
-        self.width = width
-        self.height = height
-        self.object_in_table = object_in_table
-        self.scale_plan = scale_plan
-        self.blurring = blurring
-        print(f"RadiationWorker initialized with dimensions: {width}x{height}")  # Debug print
-
-    def run(self):
-        try:
-            print(f"Starting calculations for object {self.object_in_table['name']}")  # Debug print
-
-            # создадим силу воздействия
-            R6 = int(self.object_in_table['R6'])
-            dist_power = [i for i in range(R6)]
-            power = list(reversed([i / 100 for i in dist_power]))
-
-            print(f"Power array created with length: {len(power)}")  # Debug print
-
-            # нулевая матрица
-            zeros_array = np.zeros((self.height, self.width))  # Изменен порядок размерностей
-
-            # Создадим объект до которого идет измерение
-            obj = self.create_shapely_object()
-            print(f"Created shapely object: {obj}")  # Debug print
-
-            # ШАГ 1.
-            print("Starting step 1: 50px squares")
-            find_square_50 = self.search_nearby_squares(
-                x_min=0,
-                x_max=self.width - 1,  # Уменьшаем на 1 чтобы не выйти за границы
-                y_min=0,
-                y_max=self.height - 1,
-                size_search=SEARCH_STEPS[0],
-                object_under_study=obj
-            )
-            print(f"Found {len(find_square_50) // 8} squares in step 1")  # Debug print
-
-            # ШАГ 2.
-            print("Starting step 2: 10px squares")
-            find_square_10 = []
-            for i in range(0, len(find_square_50), 8):
-                sq = find_square_50[i:i + 8]
-                result_square = self.search_nearby_squares(
-                    x_min=sq[0],
-                    x_max=min(sq[2], self.width - 1),
-                    y_min=sq[1],
-                    y_max=min(sq[5], self.height - 1),
-                    size_search=SEARCH_STEPS[1],
-                    object_under_study=obj
-                )
-                find_square_10.extend(result_square)
-            print(f"Found {len(find_square_10) // 8} squares in step 2")  # Debug print
-
-            # ШАГ 3.
-            print("Starting step 3: 2px squares")
-            find_square_2 = []
-            for i in range(0, len(find_square_10), 8):
-                sq = find_square_10[i:i + 8]
-                result_square = self.search_nearby_squares(
-                    x_min=sq[0],
-                    x_max=min(sq[2], self.width - 1),
-                    y_min=sq[1],
-                    y_max=min(sq[5], self.height - 1),
-                    size_search=SEARCH_STEPS[2],
-                    object_under_study=obj
-                )
-                find_square_2.extend(result_square)
-            print(f"Found {len(find_square_2) // 8} squares in step 3")  # Debug print
-
-            # ШАГ 4.
-            print("Starting step 4: individual points")
-            find_coordinate_step_4 = []
-            for i in range(0, len(find_square_2), 8):
-                sq = find_square_2[i:i + 8]
-                x_line = [i for i in range(sq[0], min(sq[2] + 1, self.width), SEARCH_STEPS[3])]
-                y_line = [i for i in range(sq[1], min(sq[5] + 1, self.height), SEARCH_STEPS[3])]
-                for x in x_line:
-                    for y in y_line:
-                        search_point = Point(x, y)
-                        find_coordinate_step_4.append(search_point)
-
-            print(f"Processing {len(find_coordinate_step_4)} points")  # Debug print
-
-            # Удалим повторы точек и посчитаем в какой точке какое воздействие
-            unique_points = list(set(find_coordinate_step_4))
-            print(f"Processing {len(unique_points)} unique points")  # Debug print
-
-            for item in unique_points:
-                distance = int(item.distance(obj))
-                x, y = int(item.x), int(item.y)
-
-                # Проверка границ массива
-                if 0 <= y < self.height and 0 <= x < self.width:
-                    if distance == 0:
-                        zeros_array[y, x] = max(power)
-                    else:
-                        if distance <= R6:
-                            dist_index = min(distance - 1, len(dist_power) - 1)
-                            zeros_array[y, x] = power[dist_index]
-
-            print("Calculations completed successfully")  # Debug print
-
-        except Exception as e:
-            print(f"Error in calculations: {str(e)}")  # Debug print
-            self.signals.error.emit(str(e))
-            return
-
-        self.signals.result.emit(zeros_array)
-        self.signals.finished.emit()
-
-    def create_shapely_object(self):
-        """
-        Создает геометрический объект Shapely из данных таблицы
-        """
-        # Преобразуем строку координат в список пар координат
-        coords_str = self.object_in_table['coordinates']
-        # Убираем скобки и разделяем по точке с запятой
-        coord_pairs = coords_str.replace('(', '').replace(')', '').split('; ')
-        # Преобразуем строки координат в числа
-        coords = []
-        for pair in coord_pairs:
-            x, y = map(float, pair.split(','))
-            coords.append((x, y))
-
-        obj_type = self.object_in_table['type']
-
-        if obj_type == 'point':
-            return Point(coords[0])
-        elif obj_type == 'linear':
-            return LineString(coords)
-        elif obj_type == 'stationary':
-            return Polygon(coords)
-        else:
-            raise ValueError(f"Неизвестный тип объекта: {obj_type}")
-
-    def search_nearby_squares(self, x_min: int, x_max: int, y_min: int, y_max: int,
-                              size_search: int, object_under_study) -> list:
-        """
-        Функция поиска близлежащих координат
-        """
-        R6 = float(self.object_in_table['R6'])  # Преобразуем в float
-        x_line = range(x_min, x_max + 1, size_search)
-        y_line = range(y_min, y_max + 1, size_search)
-        result_square = []
-
-        for x in x_line:
-            for y in y_line:
-                # Создаем квадрат для проверки
-                square_coords = [
-                    (x, y),
-                    (min(x + size_search, self.width), y),
-                    (min(x + size_search, self.width), min(y + size_search, self.height)),
-                    (x, min(y + size_search, self.height))
-                ]
-                search_polygon = Polygon(square_coords)
-
-                try:
-                    distance = search_polygon.distance(object_under_study)
-                    if distance < R6:
-                        result_square.extend([
-                            x, y,
-                            min(x + size_search, self.width), y,
-                            min(x + size_search, self.width), min(y + size_search, self.height),
-                            x, min(y + size_search, self.height)
-                        ])
-                except Exception as e:
-                    print(f"Error calculating distance for square at ({x},{y}): {e}")
-                    continue
-
-        return result_square
-
-
-class RiskCalculator:
-    def __init__(self, main_window):
         self.main_window = main_window
-        self.thread_pool = QThreadPool()
-        self.heatmap = np.zeros((1, 1))
+        self.backend = create_backend(backend)
+        # Функция убывания силы воздействия с расстоянием (см. risk_decay)
+        self.decay = decay
+        # Способ расчета поля расстояний (см. risk_raster.DISTANCE_ENGINES)
+        self.engine = engine
+        # Размер ячейки сетки расчета в метрах (None - ячейка равна пикселю плана)
+        # и способ ее масштабирования до размеров плана при отображении
+        self.cell_size = cell_size
+        self.upsampling = upsampling
+        # Кэш вкладов объектов; без него каждый объект рассчитывается заново
+        self.cache = cache
+        self.grid = RiskGrid(1, 1, 1.0)
+        self.accumulator = HeatmapAccumulator(1, 1)
         self.start_time = time.time()
         self.object_times = {}
+        self.total = 0
+        self.completed = 0
+        self.running = False
 
-    def calculate_risk(self, objects):
-        """Вычисляет зоны риска для списка объектов"""
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(self.PREVIEW_INTERVAL_MS)
+        self.preview_timer.timeout.connect(self.update_preview)
+
+    @property
+    def heatmap(self) -> np.ndarray:
+        return self.accumulator.values
+
+    def is_running(self) -> bool:
+        return self.running
+
+    def start(self, objects):
+        """Запускает расчет зон риска для списка объектов"""
         print("Starting calculate_risk")
         scene_rect = self.main_window.scene.sceneRect()
-        width = int(scene_rect.width())
-        height = int(scene_rect.height())
-
-        self.heatmap = np.zeros((height, width))
-
-        for obj in objects:
-            # Преобразуем Object в словарь
-            obj_dict = {
-                'name': obj.name,
-                'type': obj.object_type.value,
-                'R1': obj.R1,
-                'R2': obj.R2,
-                'R3': obj.R3,
-                'R4': obj.R4,
-                'R5': obj.R5,
-                'R6': obj.R6,
-                'coordinates': '; '.join([f"({c.x}, {c.y})" for c in obj.coordinates])
-            }
-
-            print(f"Processing object: {obj_dict['name']}")
-            self.object_times[obj_dict['name']] = time.time()
-
-            worker = RadiationWorker(
-                width,
-                height,
-                obj_dict,
-                self.main_window.scale_for_plan,
-                blurring=1
-            )
-            worker.signals.result.connect(self.worker_output)
-            worker.signals.finished.connect(
-                lambda name=obj_dict['name']: self.worker_complete(name)
+        self.grid = RiskGrid.for_plan(
+            int(scene_rect.width()),
+            int(scene_rect.height()),
+            self.main_window.scale_for_plan,
+            self.cell_size
+        )
+        # Дальше расчет ведется в ячейках сетки: размеры карты - число ячеек,
+        # масштаб - метров в ячейке
+        self.width = self.grid.columns
+        self.height = self.grid.rows
+        self.scale_plan = self.grid.cell_scale
+        print(f"Risk grid: {self.width}x{self.height} cells of {self.scale_plan:.3f} m")
+
+        # Worker'ы прибавляют свои плитки к общей карте прямо из фоновых потоков
+        self.accumulator = HeatmapAccumulator(self.width, self.height)
+        self.start_time = time.time()
+
+        # Преобразуем объекты в словари с массивами координат в ячейках сетки
+        tasks = risk_tasks(objects, self.grid, self.decay, self.engine)
+
+        self.total = len(tasks)
+        self.completed = 0
+
+        # Объекты, не изменившиеся с прошлого расчета, берем из кэша. Кэш -
+        # только ускорение: если его не прочитать, все объекты считаются заново
+        cached = {}
+        if self.cache is not None:
+            try:
+                cached = self.cache.load(tasks, self.width, self.height, self.scale_plan)
+            except Exception as e:
+                print(f"Error loading risk cache: {str(e)}")
+                cached = {}
+
+        pending = []
+        for task in tasks:
+            tile = cached.get(task['id'])
+            if tile is None:
+                print(f"Processing object: {task['name']}")
+                self.object_times[task['name']] = time.time()
+                pending.append(task)
+            else:
+                print(f"Object loaded from cache: {task['name']}")
+                self.accumulator.add(tile)
+                self._advance(task['name'])
+
+        if not tasks:
+            self._finish()
+            return
+        if not pending:
+            return
+
+        # Флаг ставится только перед запуском фоновых задач: ошибка на
+        # подготовке не должна оставить расчет "выполняющимся"
+        self.running = True
+        try:
+            self.backend.start(
+                pending,
+                self.width,
+                self.height,
+                self.scale_plan,
+                self.accumulator,
+                self.worker_complete,
+                self.worker_error
             )
-            self.thread_pool.start(worker)
+        except Exception:
+            self.running = False
+            raise
 
-        # Ждем завершения всех расчетов
-        while self.thread_pool.activeThreadCount() > 0:
-            QApplication.processEvents()
+    def cancel(self):
+        """Прерывает расчет, результаты уже запущенных worker'ов отбрасываются"""
+        if not self.running:
+            return
+        self.running = False
+        self.preview_timer.stop()
+        self.backend.cancel()
+        print(f"Risk calculation cancelled after {self.completed} of {self.total} objects")
+        self.cancelled.emit()
 
+    def calculate_risk(self, objects):
+        """Вычисляет зоны риска для списка объектов и ждет результата"""
+        result = []
+        loop = QEventLoop()
+        self.finished.connect(result.append)
+        self.finished.connect(loop.quit)
+        self.cancelled.connect(loop.quit)
+        self.start(objects)
+        if self.running:
+            loop.exec()
+        return result[0] if result else None
+
+    def worker_complete(self, task, tile):
+        """Обработка завершения worker'а: плитка уже прибавлена к карте"""
+        if not self.running:
+            return
+        obj_name = task['name']
+        object_time = time.time() - self.object_times[obj_name]
+        print(f"Worker complete for {obj_name}. Time taken: {object_time:.2f} seconds")
+        if self.cache is not None:
+            self.cache.store(task, tile, self.width, self.height, self.scale_plan)
+        if not self.preview_timer.isActive():
+            self.preview_timer.start()
+        self._advance(obj_name)
+
+    def worker_error(self, task, message):
+        """Обработка ошибки worker'а: объект пропускается, расчет продолжается"""
+        if not self.running:
+            return
+        print(f"Worker failed for {task['name']}: {message}")
+        self._advance(task['name'])
+
+    def _advance(self, obj_name):
+        self.completed += 1
+        self.progress.emit(self.completed, self.total, obj_name)
+        if self.completed == self.total:
+            self._finish()
+
+    def _finish(self):
+        self.running = False
+        self.preview_timer.stop()
+        self.backend.release()
+        if self.cache is not None:
+            try:
+                self.cache.flush()
+            except Exception as e:
+                print(f"Error saving risk cache: {str(e)}")
         print("All workers completed")
+        print(f"Total time: {time.time() - self.start_time:.2f} seconds")
         print(f"Final heatmap values - max: {np.max(self.heatmap)}, min: {np.min(self.heatmap)}")
-        return self.create_risk_pixmap(self.heatmap)
+        self.finished.emit(self.create_risk_pixmap(self.heatmap))
 
-    def worker_output(self, result_array):
-        """Обработка результата от worker'а"""
-        print("Received worker output")
-        print(f"Result array max: {np.max(result_array)}, min: {np.min(result_array)}")
-        self.heatmap = self.heatmap + result_array
+    def update_preview(self):
+        """
+        Испускает промежуточное изображение по уже рассчитанным объектам
 
-    def worker_complete(self, obj_name):
-        """Обработка завершения worker'а"""
-        object_time = time.time() - self.object_times[obj_name]
-        print(f"Worker complete for {obj_name}. Time taken: {object_time:.2f} seconds")
+        Карта читается без блокировки: предпросмотр может не учесть плитку,
+        которая прибавляется в этот момент, итоговое изображение строится
+        после завершения всех worker'ов.
+        """
+        if self.running:
+            self.preview.emit(self.create_risk_pixmap(self.heatmap))
 
     def create_risk_pixmap(self,heatmap):
         print("Generating heatmap visualization")  # Отладочный вывод
+        # Карта сетки разворачивается до размеров плана только для отображения
+        heatmap = self.grid.upsample(heatmap, self.upsampling)
         print(f"Array max value: {np.max(heatmap)}, min value: {np.min(heatmap)}")
 
-        bins = np.array([i * np.max(heatmap) / 30 for i in range(1, 31)])
-        digitize = np.digitize(heatmap, bins, right=True)
-        digitize = np.expand_dims(digitize, axis=2)
-        # Поворачиваем против часовой стрелки и отражаем
-        digitize = np.fliplr(digitize)
-        digitize = np.rot90(digitize, k=-3)
-        digitize = np.fliplr(digitize)
-        digitize = np.rot90(digitize, k=1)
-
-        im = np.choose(digitize, PALETTE, mode='clip')
+        im = risk_image(heatmap)
         h, w, _ = im.shape
-        # Находим белые пиксели (RGB = 255,255,255) и делаем их прозрачными
-        white_pixels = (im[..., 0] == 255) & (im[..., 1] == 255) & (im[..., 2] == 255)
-        im[white_pixels, 3] = 0  # Устанавливаем альфа-канал в 0 для белых пикселей
         print(f"Generated image dimensions: {w}x{h}")  # Отладочный вывод
-        image = QImage(im.data, w, h, 4 * w, QImage.Format_ARGB32)
 
-        return QPixmap.fromImage(image)
+        return pixmap_from_array(im)
+
+
+class RiskProgressWidget(QWidget):
+    """Индикатор хода расчета риска с кнопкой отмены для строки состояния"""
+
+    def __init__(self, calculator: RiskCalculator, total: int, parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("Риск: %v из %m")
+
+        cancel_button = QPushButton("Отмена")
+        cancel_button.clicked.connect(calculator.cancel)
+
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(cancel_button)
+
+        calculator.progress.connect(self.update_progress)
+
+    def update_progress(self, completed: int, total: int, obj_name: str):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(completed)
+        self.setToolTip(f"Рассчитан объект: {obj_name}")
 
 
 def draw_risk_zones(main_window) -> bool:
-    """Отрисовывает зоны риска для всех объектов на плане"""
+    """
+    Запускает расчет и отрисовку зон риска для всех объектов на плане
+
+    Расчет идет в фоне: карта на сцене обновляется по мере готовности
+    объектов, ход расчета и кнопка отмены показываются в строке состояния.
+
+    Returns:
+        bool: True если расчет запущен
+    """
     # Проверяем, что план загружен
     if not main_window.is_plan_loaded():
         main_window.statusBar().showMessage(
@@ -317,36 +277,95 @@ def draw_risk_zones(main_window) -> bool:
         )
         return False
 
+    # Не запускаем второй расчет поверх текущего
+    if main_window.risk_calculator and main_window.risk_calculator.is_running():
+        main_window.statusBar().showMessage(
+            "Расчет риска уже выполняется",
+            3000
+        )
+        return False
+
+    calculator = None
+    risk_item = None
+    progress_widget = None
     try:
         # Получаем все объекты текущего плана
         with DatabaseManager(main_window.db_handler.current_db_path) as db:
             objects = db.objects.get_by_image_id(main_window.current_image_id)
 
-            if not objects:
-                main_window.statusBar().showMessage(
-                    "На плане нет объектов для отрисовки",
-                    3000
-                )
-                return False
-
-            # Создаем калькулятор и выполняем расчет
-            calculator = RiskCalculator(main_window)
-            risk_pixmap = calculator.calculate_risk(objects)
-
-            # Создаем и добавляем элемент на сцену
-            risk_item = QGraphicsPixmapItem(risk_pixmap)
-            risk_item.setOpacity(0.6)
-            main_window.scene.addItem(risk_item)
+        if not objects:
+            main_window.statusBar().showMessage(
+                "На плане нет объектов для отрисовки",
+                3000
+            )
+            return False
 
+        cache = RiskTileCache(
+            main_window.db_handler.current_db_path,
+            main_window.current_image_id
+        )
+        calculator = RiskCalculator(main_window, main_window.risk_backend, cache,
+                                    main_window.risk_decay, main_window.risk_cell_size,
+                                    main_window.risk_upsampling, main_window.risk_engine)
+        main_window.risk_calculator = calculator
+
+        # Элемент сцены, который обновляется по мере расчета
+        risk_item = QGraphicsPixmapItem()
+        risk_item.setOpacity(0.6)
+        main_window.scene.addItem(risk_item)
+
+        progress_widget = RiskProgressWidget(calculator, len(objects))
+        main_window.statusBar().addPermanentWidget(progress_widget)
+
+        def set_pixmap(pixmap):
+            try:
+                risk_item.setPixmap(pixmap)
+            except RuntimeError:
+                # Сцена была очищена во время расчета
+                calculator.cancel()
+
+        def on_finished(pixmap):
+            main_window.statusBar().removeWidget(progress_widget)
+            progress_widget.deleteLater()
+            set_pixmap(pixmap)
             main_window.statusBar().showMessage(
                 "Зоны риска отрисованы",
                 3000
             )
-            return True
+
+        def on_cancelled():
+            main_window.statusBar().removeWidget(progress_widget)
+            progress_widget.deleteLater()
+            try:
+                main_window.scene.removeItem(risk_item)
+            except RuntimeError:
+                pass
+            main_window.statusBar().showMessage(
+                "Расчет зон риска отменен",
+                3000
+            )
+
+        calculator.preview.connect(set_pixmap)
+        calculator.finished.connect(on_finished)
+        calculator.cancelled.connect(on_cancelled)
+
+        calculator.start(objects)
+        return True
 
     except Exception as e:
+        # Расчет не запустился: убираем его индикатор и пустой элемент сцены
+        if progress_widget is not None:
+            main_window.statusBar().removeWidget(progress_widget)
+            progress_widget.deleteLater()
+        if risk_item is not None:
+            try:
+                main_window.scene.removeItem(risk_item)
+            except RuntimeError:
+                pass
+        if calculator is not None and main_window.risk_calculator is calculator:
+            main_window.risk_calculator = None
         main_window.statusBar().showMessage(
             f"Ошибка при отрисовке зон риска: {str(e)}",
             3000
         )
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,164 @@
+"""
+Векторизованный расчет поля расстояний до объектов плана.
+
+Расстояние до точки, отрезков ломаной и полигона считается сразу для всей
+сетки пикселей средствами NumPy, без построения геометрии Shapely для
+каждого пикселя. Пиксели задаются целыми координатами (x, y) сцены.
+"""
+import numpy as np
+
+
+def parse_coordinates(coords_str: str) -> np.ndarray:
+    """
+    Преобразует строку координат вида '(x, y); (x, y)' в массив формы (N, 2)
+    """
+    coord_pairs = coords_str.replace('(', '').replace(')', '').split('; ')
+    return np.array(
+        [tuple(map(float, pair.split(','))) for pair in coord_pairs],
+        dtype=float
+    ).reshape(-1, 2)
+
+
+def object_window(coords: np.ndarray, max_distance: float, width: int, height: int) -> tuple:
+    """
+    Возвращает окно пикселей, на которые может влиять объект
+
+    Args:
+        coords: координаты объекта, массив (N, 2)
+        max_distance: радиус влияния в пикселях
+        width: ширина плана
+        height: высота плана
+
+    Returns:
+        tuple: (x_min, y_min, x_max, y_max), правые границы не включаются
+    """
+    x_min = min(max(int(np.floor(coords[:, 0].min() - max_distance)), 0), width)
+    y_min = min(max(int(np.floor(coords[:, 1].min() - max_distance)), 0), height)
+    x_max = max(min(int(np.ceil(coords[:, 0].max() + max_distance)) + 1, width), x_min)
+    y_max = max(min(int(np.ceil(coords[:, 1].max() + max_distance)) + 1, height), y_min)
+    return x_min, y_min, x_max, y_max
+
+
+def _grid(window: tuple):
+    """Возвращает координаты столбцов (1, W) и строк (H, 1) окна"""
+    x_min, y_min, x_max, y_max = window
+    xs = np.arange(x_min, x_max, dtype=float)[np.newaxis, :]
+    ys = np.arange(y_min, y_max, dtype=float)[:, np.newaxis]
+    return xs, ys
+
+
+def _clip_window(window: tuple, x_min: float, y_min: float, x_max: float, y_max: float) -> tuple:
+    """Пересекает окно с прямоугольником, заданным в координатах сцены"""
+    wx_min, wy_min, wx_max, wy_max = window
+    cx_min = min(max(int(np.floor(x_min)), wx_min), wx_max)
+    cy_min = min(max(int(np.floor(y_min)), wy_min), wy_max)
+    cx_max = max(min(int(np.ceil(x_max)) + 1, wx_max), cx_min)
+    cy_max = max(min(int(np.ceil(y_max)) + 1, wy_max), cy_min)
+    return cx_min, cy_min, cx_max, cy_max
+
+
+def point_distance(point, window: tuple) -> np.ndarray:
+    """Расстояние от каждого пикселя окна до точки"""
+    xs, ys = _grid(window)
+    return np.hypot(xs - point[0], ys - point[1])
+
+
+def segment_distance(start, end, window: tuple) -> np.ndarray:
+    """Расстояние от каждого пикселя окна до отрезка start-end"""
+    xs, ys = _grid(window)
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return np.hypot(xs - start[0], ys - start[1])
+
+    # Параметр проекции пикселя на отрезок, ограниченный концами отрезка
+    t = ((xs - start[0]) * dx + (ys - start[1]) * dy) / length_sq
+    np.clip(t, 0.0, 1.0, out=t)
+    return np.hypot(xs - (start[0] + t * dx), ys - (start[1] + t * dy))
+
+
+def polyline_distance(coords: np.ndarray, window: tuple, max_distance: float) -> np.ndarray:
+    """
+    Расстояние от каждого пикселя окна до ломаной
+
+    Каждый отрезок обсчитывается только в своем окне, расширенном на
+    max_distance. Пиксели дальше max_distance от ломаной могут остаться
+    со значением inf.
+    """
+    x_min, y_min, x_max, y_max = window
+    result = np.full((y_max - y_min, x_max - x_min), np.inf)
+
+    for start, end in zip(coords[:-1], coords[1:]):
+        sub = _clip_window(
+            window,
+            min(start[0], end[0]) - max_distance,
+            min(start[1], end[1]) - max_distance,
+            max(start[0], end[0]) + max_distance,
+            max(start[1], end[1]) + max_distance
+        )
+        if sub[0] == sub[2] or sub[1] == sub[3]:
+            continue
+        view = result[sub[1] - y_min:sub[3] - y_min, sub[0] - x_min:sub[2] - x_min]
+        np.minimum(view, segment_distance(start, end, sub), out=view)
+
+    return result
+
+
+def polygon_contains(coords: np.ndarray, window: tuple) -> np.ndarray:
+    """
+    Маска пикселей окна, лежащих внутри полигона (правило четности пересечений)
+    """
+    x_min, y_min, x_max, y_max = window
+    inside = np.zeros((y_max - y_min, x_max - x_min), dtype=bool)
+
+    # Вне габаритов полигона пикселей внутри быть не может
+    sub = _clip_window(window, *coords.min(axis=0), *coords.max(axis=0))
+    if sub[0] == sub[2] or sub[1] == sub[3]:
+        return inside
+    xs, ys = _grid(sub)
+    view = inside[sub[1] - y_min:sub[3] - y_min, sub[0] - x_min:sub[2] - x_min]
+
+    for start, end in zip(coords[:-1], coords[1:]):
+        # Строки, которые пересекает ребро; горизонтальные ребра пропускаются
+        crossing = (start[1] > ys) != (end[1] > ys)
+        if not crossing.any():
+            continue
+        x_cross = np.where(
+            crossing,
+            start[0] + (ys - start[1]) * (end[0] - start[0]) / np.where(crossing, end[1] - start[1], 1.0),
+            -np.inf
+        )
+        view ^= xs < x_cross
+
+    return inside
+
+
+def distance_field(object_type: str, coords: np.ndarray, window: tuple,
+                   max_distance: float) -> np.ndarray:
+    """
+    Расстояние от каждого пикселя окна до объекта
+
+    Args:
+        object_type: тип объекта ('point', 'linear', 'stationary')
+        coords: координаты объекта, массив (N, 2)
+        window: окно пикселей (x_min, y_min, x_max, y_max)
+        max_distance: радиус, за пределами которого точность не требуется
+
+    Returns:
+        np.ndarray: массив расстояний формы (H, W) окна
+    """
+    if object_type == 'point':
+        return point_distance(coords[0], window)
+    elif object_type == 'linear':
+        return polyline_distance(coords, window, max_distance)
+    elif object_type == 'stationary':
+        # Контур полигона замыкается, как это делает Shapely
+        if not np.array_equal(coords[0], coords[-1]):
+            coords = np.vstack([coords, coords[:1]])
+        distance = polyline_distance(coords, window, max_distance)
+        distance[polygon_contains(coords, window)] = 0.0
+        return distance
+    else:
+        raise ValueError(f"Неизвестный тип объекта: {object_type}")
+
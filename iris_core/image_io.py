@@ -0,0 +1,138 @@
+"""
+Чтение размеров плана и запись растров без графических библиотек.
+
+Размер изображения плана определяется по заголовку JPEG или PNG без
+декодирования пикселей. Результаты пишутся в PNG (RGBA) и в TIFF с
+float32 значениями; к каждому файлу прикладывается world-файл с размером
+пикселя в метрах, чтобы растр можно было наложить на план в ГИС.
+"""
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+# Маркеры начала кадра JPEG, в которых записан размер изображения
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def image_size(data: bytes) -> tuple:
+    """
+    Возвращает размер изображения (ширина, высота) по заголовку JPEG или PNG
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return struct.unpack('>II', data[16:24])
+
+    if data[:2] == b'\xff\xd8':
+        pos = 2
+        while pos + 4 <= len(data):
+            if data[pos] != 0xFF:
+                pos += 1
+                continue
+            marker = data[pos + 1]
+            if marker == 0xFF:
+                pos += 1
+                continue
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                pos += 2
+                continue
+            length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+            if marker in JPEG_SOF_MARKERS:
+                height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+                return width, height
+            pos += 2 + length
+
+    raise ValueError("Неподдерживаемый формат изображения")
+
+
+def stream_image_size(stream, chunk_size: int = 64 * 1024) -> tuple:
+    """
+    Возвращает размер изображения по заголовку, читая поток частями
+
+    Читается только начало файла до заголовка с размером (у JPEG перед
+    ним могут идти блоки метаданных), а не изображение целиком.
+
+    Args:
+        stream: объект с методом read(size) - файл, io.BytesIO, sqlite3.Blob
+        chunk_size: размер первой порции, следующие удваиваются
+    """
+    data = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        data += chunk
+        try:
+            return image_size(data)
+        except (ValueError, struct.error):
+            # Заголовок еще не прочитан целиком
+            if not chunk:
+                raise ValueError("Неподдерживаемый формат изображения")
+        chunk_size *= 2
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return (struct.pack('>I', len(data)) + chunk_type + data +
+            struct.pack('>I', zlib.crc32(chunk_type + data) & 0xFFFFFFFF))
+
+
+def write_png(path, rgba: np.ndarray) -> None:
+    """Записывает изображение (H, W, 4) uint8 с порядком каналов RGBA в PNG"""
+    height, width, _ = rgba.shape
+    # Каждая строка начинается с байта фильтра (0 - без фильтра)
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = np.ascontiguousarray(rgba, dtype=np.uint8).reshape(height, width * 4)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+        f.write(_png_chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)))
+        f.write(_png_chunk(b'IEND', b''))
+
+
+def write_tiff(path, values: np.ndarray) -> None:
+    """Записывает массив (H, W) в несжатый одноканальный TIFF с float32"""
+    height, width = values.shape
+    data = np.ascontiguousarray(values, dtype='<f4').tobytes()
+    # Теги: ширина, высота, бит на отсчет, сжатие, фотометрия, смещение
+    # данных, отсчетов на пиксель, строк в полосе, размер полосы, формат отсчета
+    tags = [
+        (256, 4, width),
+        (257, 4, height),
+        (258, 3, 32),
+        (259, 3, 1),
+        (262, 3, 1),
+        (273, 4, 0),
+        (277, 3, 1),
+        (278, 4, height),
+        (279, 4, len(data)),
+        (339, 3, 3),
+    ]
+    ifd_size = 2 + len(tags) * 12 + 4
+    data_offset = 8 + ifd_size
+    with open(path, 'wb') as f:
+        f.write(b'II*\x00' + struct.pack('<I', 8))
+        f.write(struct.pack('<H', len(tags)))
+        for tag, field_type, value in tags:
+            if tag == 273:
+                value = data_offset
+            if field_type == 3:
+                f.write(struct.pack('<HHIHH', tag, field_type, 1, value, 0))
+            else:
+                f.write(struct.pack('<HHII', tag, field_type, 1, value))
+        f.write(struct.pack('<I', 0))
+        f.write(data)
+
+
+def write_world_file(image_path, scale: float) -> Path:
+    """
+    Записывает world-файл для растра плана (.pgw для PNG, .tfw для TIFF)
+
+    Начало координат - левый верхний угол плана, ось Y направлена вверх,
+    размер пикселя равен масштабу плана в метрах.
+    """
+    image_path = Path(image_path)
+    suffix = image_path.suffix.lower()
+    world_suffix = '.' + suffix[1] + suffix[-1] + 'w'
+    world_path = image_path.with_suffix(world_suffix)
+    lines = [scale, 0.0, 0.0, -scale, scale / 2, -scale / 2]
+    world_path.write_text('\n'.join(f"{value:.10f}" for value in lines) + '\n')
+    return world_path
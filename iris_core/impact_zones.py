@@ -0,0 +1,89 @@
+"""
+Зоны поражающих факторов объектов плана без графического интерфейса.
+
+Зона Rk объекта - множество точек не дальше Rk метров от его геометрии:
+круг вокруг точечного объекта, полоса вдоль линейного и многоугольник,
+расширенный на Rk, для стационарного. Зоны возвращаются как геометрии
+Shapely или растром размером с план.
+"""
+import numpy as np
+
+from iris_core.distance_field import object_window, distance_field
+from iris_core.shapely_field import object_geometry
+
+ZONES = ('R1', 'R2', 'R3', 'R4', 'R5', 'R6')
+
+# Цвета зон (R, G, B)
+ZONE_COLORS = {
+    'R1': (255, 0, 0),  # Красный
+    'R2': (0, 0, 255),  # Синий
+    'R3': (255, 165, 0),  # Оранжевый
+    'R4': (0, 255, 0),  # Зеленый
+    'R5': (128, 0, 128),  # Фиолетовый
+    'R6': (255, 255, 0),  # Желтый
+}
+
+# Значение растра зон для пикселей вне всех зон
+NO_ZONE = len(ZONES)
+
+
+def object_coordinates(obj) -> np.ndarray:
+    """Координаты объекта плана массивом (N, 2)"""
+    return np.array([(c.x, c.y) for c in obj.coordinates], dtype=float).reshape(-1, 2)
+
+
+def zone_geometries(obj, scale: float) -> dict:
+    """
+    Геометрии зон объекта в пикселях плана
+
+    Returns:
+        dict: {'R1': геометрия, ..., 'R6': геометрия}
+    """
+    geometry = object_geometry(obj.object_type.value, object_coordinates(obj))
+    return {zone: geometry.buffer(getattr(obj, zone) / scale) for zone in ZONES}
+
+
+def zone_raster(objects: list, width: int, height: int, scale: float) -> np.ndarray:
+    """
+    Растр зон всех объектов плана
+
+    Каждый пиксель получает номер самой внутренней зоны, в которую он
+    попадает хотя бы для одного объекта (0 - R1, ..., 5 - R6), пиксели вне
+    зон - NO_ZONE.
+
+    Returns:
+        np.ndarray: массив (height, width) uint8
+    """
+    result = np.full((height, width), NO_ZONE, dtype=np.uint8)
+    for obj in objects:
+        coords = object_coordinates(obj)
+        radii = [getattr(obj, zone) / scale for zone in ZONES]
+        window = object_window(coords, max(radii), width, height)
+        if window[0] == window[2] or window[1] == window[3]:
+            continue
+
+        distance = distance_field(obj.object_type.value, coords, window, max(radii))
+        zone = np.full(distance.shape, NO_ZONE, dtype=np.uint8)
+        # От внешней зоны к внутренней, как при рисовании поверх
+        for index in reversed(range(len(ZONES))):
+            zone[distance <= radii[index]] = index
+
+        x_min, y_min, x_max, y_max = window
+        view = result[y_min:y_max, x_min:x_max]
+        np.minimum(view, zone, out=view)
+    return result
+
+
+def impact_zones_image(objects: list, width: int, height: int, scale: float) -> np.ndarray:
+    """
+    Изображение зон поражающих факторов объектов
+
+    Returns:
+        np.ndarray: изображение (height, width, 4) uint8, порядок байтов BGRA
+            (как у QImage.Format_ARGB32); вне зон пиксели прозрачные
+    """
+    palette = np.zeros((NO_ZONE + 1, 4), dtype=np.uint8)
+    for index, zone in enumerate(ZONES):
+        r, g, b = ZONE_COLORS[zone]
+        palette[index] = (b, g, r, 255)
+    return palette[zone_raster(objects, width, height, scale)]
@@ -0,0 +1,81 @@
+"""
+Функции убывания силы воздействия с расстоянием.
+
+Каждая функция получает массив расстояний в метрах и радиусы зон R1-R6
+объекта в метрах и возвращает массив силы воздействия той же формы.
+Граница R6 не входит в зону воздействия: начиная с расстояния R6 сила
+воздействия равна нулю (как в исходном расчете, где учитывались только
+точки ближе R6).
+"""
+import numpy as np
+
+# Показатель экспоненты: на расстоянии R6 остается exp(-3) ~ 5% воздействия
+EXPONENTIAL_RATE = 3.0
+
+
+def stepwise_decay(distance: np.ndarray, radii: tuple) -> np.ndarray:
+    """
+    Ступенчатая шкала: сила убывает на 0.01 на каждый целый метр
+    расстояния и равна нулю начиная с R6
+    """
+    R6 = float(radii[5])
+    result = np.zeros(distance.shape)
+    if R6 <= 0:
+        return result
+    mask = distance < R6
+    steps = np.floor(distance[mask])
+    result[mask] = (R6 - np.maximum(steps, 1)) / 100
+    return result
+
+
+def linear_decay(distance: np.ndarray, radii: tuple) -> np.ndarray:
+    """Линейное убывание от 1 на объекте до 0 на расстоянии R6"""
+    R6 = float(radii[5])
+    if R6 <= 0:
+        return np.zeros(distance.shape)
+    return np.clip(1.0 - distance / R6, 0.0, 1.0)
+
+
+def exponential_decay(distance: np.ndarray, radii: tuple) -> np.ndarray:
+    """Экспоненциальное убывание, обрезанное на расстоянии R6"""
+    R6 = float(radii[5])
+    if R6 <= 0:
+        return np.zeros(distance.shape)
+    result = np.exp(-EXPONENTIAL_RATE * distance / R6)
+    result[distance >= R6] = 0.0
+    return result
+
+
+def piecewise_decay(distance: np.ndarray, radii: tuple) -> np.ndarray:
+    """
+    Кусочно-постоянная шкала по зонам R1-R6: 1 в зоне R1, 5/6 в зоне R2
+    и так далее до 1/6 в зоне R6, ноль начиная с R6
+    """
+    R6 = float(radii[5])
+    # Номер зоны: 0 - не дальше R1, 6 - дальше всех радиусов
+    zone = np.searchsorted(np.sort(np.asarray(radii, dtype=float)), distance, side='left')
+    result = (6 - zone) / 6
+    result[distance >= R6] = 0.0
+    return result
+
+
+DECAY_FUNCTIONS = {
+    'stepwise': stepwise_decay,
+    'linear': linear_decay,
+    'exponential': exponential_decay,
+    'piecewise': piecewise_decay,
+}
+
+
+def risk_values(distance: np.ndarray, radii: tuple, decay: str = 'stepwise') -> np.ndarray:
+    """
+    Переводит расстояния в метрах в силу воздействия
+
+    Args:
+        distance: массив расстояний до объекта в метрах
+        radii: радиусы зон (R1, ..., R6) в метрах
+        decay: имя функции убывания из DECAY_FUNCTIONS
+    """
+    if decay not in DECAY_FUNCTIONS:
+        raise ValueError(f"Неизвестная функция убывания: {decay}")
+    return DECAY_FUNCTIONS[decay](distance, radii)
@@ -0,0 +1,97 @@
+"""
+Расчет карты риска без графического интерфейса.
+
+Принимает объекты плана (iris_db.models.Object), размер плана и масштаб и
+возвращает карту риска в виде массива NumPy. Используется как из
+приложения, так и из скриптов и пакетной обработки без Qt.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from iris_core.risk_raster import (HeatmapAccumulator, RiskGrid, risk_task, compute_risk_tile,
+                                   DEFAULT_UPSAMPLING)
+
+# Палитра карты риска от нулевого к максимальному значению, порядок байтов BGRA
+PALETTE = np.array([
+    [255, 255, 255, 255], [0, 50, 255, 255], [0, 100, 255, 255],
+    [0, 120, 255, 255], [0, 140, 255, 255], [0, 160, 255, 255],
+    [0, 190, 255, 255], [0, 210, 255, 255], [0, 220, 255, 255],
+    [0, 255, 255, 255], [100, 255, 255, 255], [130, 255, 0, 255],
+    [150, 255, 0, 255], [180, 255, 0, 255], [200, 255, 0, 255],
+    [220, 255, 0, 255], [230, 255, 0, 255], [240, 255, 0, 255],
+    [255, 255, 0, 255], [255, 230, 0, 255], [255, 210, 0, 255],
+    [255, 200, 0, 255], [255, 190, 0, 255], [255, 170, 0, 255],
+    [255, 150, 0, 255], [255, 120, 0, 255], [255, 80, 0, 255],
+    [255, 60, 0, 255], [255, 30, 0, 255], [255, 0, 0, 255]
+], dtype='uint8')
+PALETTE[:, [0, 2]] = PALETTE[:, [2, 0]]  # Swap R and B channels
+
+
+@dataclass
+class RiskMap:
+    """Карта риска на сетке расчета"""
+    values: np.ndarray
+    grid: RiskGrid
+
+    def to_plan(self, method: str = DEFAULT_UPSAMPLING) -> np.ndarray:
+        """Разворачивает карту до размеров плана ('nearest' или 'bilinear')"""
+        return self.grid.upsample(self.values, method)
+
+
+def risk_tasks(objects: list, grid: RiskGrid, decay: str = 'stepwise',
+               engine: str = 'numpy') -> list:
+    """Сериализует объекты плана в задачи расчета в координатах сетки"""
+    return [grid.task_to_grid(risk_task(obj, decay, engine)) for obj in objects]
+
+
+def compute_risk_map(objects: list, width: int, height: int, scale_plan: float,
+                     decay: str = 'stepwise', cell_size: float = None,
+                     engine: str = 'numpy', max_workers: int = None) -> RiskMap:
+    """
+    Рассчитывает карту риска для объектов плана
+
+    Args:
+        objects: объекты плана
+        width: ширина плана в пикселях
+        height: высота плана в пикселях
+        scale_plan: масштаб плана (метров в пикселе)
+        decay: функция убывания силы воздействия (см. risk_decay.DECAY_FUNCTIONS)
+        cell_size: размер ячейки сетки в метрах, None - ячейка равна пикселю
+        engine: способ расчета поля расстояний (см. risk_raster.DISTANCE_ENGINES)
+        max_workers: число потоков расчета, None - по числу ядер
+
+    Returns:
+        RiskMap: карта риска на сетке расчета
+    """
+    grid = RiskGrid.for_plan(width, height, scale_plan, cell_size)
+    accumulator = HeatmapAccumulator(grid.columns, grid.rows)
+
+    def add_object(task):
+        accumulator.add(compute_risk_tile(task, grid.columns, grid.rows, grid.cell_scale))
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        # list() нужен, чтобы исключения из потоков дошли до вызывающего
+        list(executor.map(add_object, risk_tasks(objects, grid, decay, engine)))
+    return RiskMap(accumulator.values, grid)
+
+
+def risk_image(heatmap: np.ndarray) -> np.ndarray:
+    """
+    Раскрашивает карту риска палитрой PALETTE
+
+    Значения делятся на 30 равных интервалов от нуля до максимума карты,
+    пиксели без риска становятся прозрачными.
+
+    Returns:
+        np.ndarray: изображение (H, W, 4) uint8, порядок байтов BGRA
+            (как у QImage.Format_ARGB32)
+    """
+    bins = np.array([i * np.max(heatmap) / 30 for i in range(1, 31)])
+    digitize = np.digitize(heatmap, bins, right=True)
+    im = PALETTE[np.minimum(digitize, len(PALETTE) - 1)]
+    # Находим белые пиксели (RGB = 255,255,255) и делаем их прозрачными
+    white_pixels = (im[..., 0] == 255) & (im[..., 1] == 255) & (im[..., 2] == 255)
+    im[white_pixels, 3] = 0
+    return im
@@ -0,0 +1,330 @@
+"""
+Растры вклада объектов в карту риска.
+
+Объект влияет только на пиксели в пределах R6 от своей геометрии, поэтому
+его вклад хранится компактной плиткой: массив габаритного окна объекта,
+расширенного на R6, и смещение этого окна на плане. Карта считается на
+сетке RiskGrid, ячейка которой может быть крупнее пикселя плана.
+
+Модуль не зависит от Qt, чтобы его функции можно было выполнять в
+отдельных процессах.
+"""
+import hashlib
+import threading
+import zlib
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from iris_core import distance_field, shapely_field
+from iris_core.distance_field import object_window
+from iris_core.risk_decay import risk_values
+
+# Меняется при изменении алгоритма расчета, чтобы старые записи кэша не использовались
+RISK_ENGINE_VERSION = 3
+
+# Способы масштабирования сетки риска до размеров плана и способ
+# по умолчанию - общий для интерфейса, RiskCalculator и пакетной отрисовки
+UPSAMPLING_METHODS = ('nearest', 'bilinear')
+DEFAULT_UPSAMPLING = 'bilinear'
+
+# Способы расчета поля расстояний: векторизованный NumPy и массивы Shapely 2
+DISTANCE_ENGINES = {
+    'numpy': distance_field.distance_field,
+    'shapely': shapely_field.distance_field,
+}
+
+
+@dataclass
+class RiskTile:
+    x: int
+    y: int
+    values: np.ndarray
+
+    @property
+    def width(self) -> int:
+        return self.values.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.values.shape[0]
+
+    def add_to(self, heatmap: np.ndarray) -> None:
+        """Прибавляет плитку к общей карте на месте, без выделения памяти под весь план"""
+        target = heatmap[self.y:self.y + self.height, self.x:self.x + self.width]
+        np.add(target, self.values, out=target)
+
+    def to_array(self, width: int, height: int) -> np.ndarray:
+        """Разворачивает плитку в массив размером с весь план"""
+        result = np.zeros((height, width))
+        self.add_to(result)
+        return result
+
+    def encode(self) -> bytes:
+        """Сжимает значения плитки для хранения в кэше"""
+        return encode_values(self.values)
+
+    @classmethod
+    def decode(cls, x: int, y: int, width: int, height: int, data: bytes) -> 'RiskTile':
+        """Восстанавливает плитку из сжатых значений"""
+        values = np.frombuffer(zlib.decompress(data), dtype=np.float64)
+        return cls(x, y, values.reshape(height, width))
+
+
+class SharedRiskTile:
+    """
+    Плитка, значения которой лежат в разделяемой памяти
+
+    Блок памяти выделяет и освобождает родительский процесс, дочерний
+    процесс только подключается к нему и записывает значения. Так результат
+    не копируется через pickle и блок не исчезает раньше времени в Windows.
+    """
+
+    def __init__(self, window: tuple):
+        x_min, y_min, x_max, y_max = window
+        self.x = x_min
+        self.y = y_min
+        self.width = x_max - x_min
+        self.height = y_max - y_min
+        size = self.width * self.height * np.dtype(np.float64).itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def add_to(self, heatmap: np.ndarray) -> None:
+        """Прибавляет плитку к общей карте на месте"""
+        values = np.ndarray((self.height, self.width), dtype=np.float64, buffer=self.shm.buf)
+        target = heatmap[self.y:self.y + self.height, self.x:self.x + self.width]
+        np.add(target, values, out=target)
+        del values
+
+    def encode(self) -> bytes:
+        """Сжимает значения плитки для хранения в кэше"""
+        values = np.ndarray((self.height, self.width), dtype=np.float64, buffer=self.shm.buf)
+        data = encode_values(values)
+        del values
+        return data
+
+    def release(self) -> None:
+        """Освобождает блок разделяемой памяти"""
+        self.shm.close()
+        self.shm.unlink()
+
+
+@dataclass
+class RiskGrid:
+    """
+    Сетка расчета карты риска
+
+    Ячейка сетки может быть крупнее пикселя плана: при шаге cell_px пикселей
+    число ячеек, а с ним память и время расчета, уменьшаются примерно в
+    cell_px ** 2 раз. Центр ячейки (i, j) лежит в точке плана
+    ((j + 0.5) * cell_px - 0.5, (i + 0.5) * cell_px - 0.5), поэтому при
+    cell_px = 1 ячейки совпадают с пикселями.
+    """
+    width: int
+    height: int
+    scale_plan: float
+    cell_px: float = 1.0
+
+    @classmethod
+    def for_plan(cls, width: int, height: int, scale_plan: float,
+                 cell_size: float = None) -> 'RiskGrid':
+        """
+        Подбирает сетку для плана
+
+        Args:
+            width: ширина плана
+            height: высота плана
+            scale_plan: масштаб плана (метров в пикселе)
+            cell_size: размер ячейки в метрах; None - ячейка равна пикселю.
+                Ячейка не бывает мельче пикселя плана.
+        """
+        if not cell_size:
+            return cls(width, height, scale_plan)
+        if not scale_plan or scale_plan <= 0:
+            raise ValueError("Масштаб плана должен быть положительным")
+        return cls(width, height, scale_plan, max(cell_size / scale_plan, 1.0))
+
+    @property
+    def columns(self) -> int:
+        return int(np.ceil(self.width / self.cell_px))
+
+    @property
+    def rows(self) -> int:
+        return int(np.ceil(self.height / self.cell_px))
+
+    @property
+    def cell_scale(self) -> float:
+        """Размер ячейки в метрах"""
+        return self.scale_plan * self.cell_px
+
+    def task_to_grid(self, task: dict) -> dict:
+        """Переводит координаты задачи из пикселей плана в ячейки сетки"""
+        if self.cell_px == 1.0:
+            return task
+        grid_task = dict(task)
+        grid_task['coordinates'] = (task['coordinates'] + 0.5) / self.cell_px - 0.5
+        return grid_task
+
+    def upsample(self, values: np.ndarray, method: str = DEFAULT_UPSAMPLING) -> np.ndarray:
+        """
+        Разворачивает значения сетки до размеров плана для отображения
+
+        Args:
+            values: массив сетки формы (rows, columns)
+            method: 'nearest' - значение ближайшей ячейки,
+                'bilinear' - билинейная интерполяция между центрами ячеек
+        """
+        if self.cell_px == 1.0:
+            return values
+        if method == 'nearest':
+            rows = np.minimum(((np.arange(self.height) + 0.5) / self.cell_px).astype(int),
+                              self.rows - 1)
+            cols = np.minimum(((np.arange(self.width) + 0.5) / self.cell_px).astype(int),
+                              self.columns - 1)
+            return values[np.ix_(rows, cols)]
+        elif method == 'bilinear':
+            r0, r1, fr = self._interpolation_axis(self.height, self.rows)
+            c0, c1, fc = self._interpolation_axis(self.width, self.columns)
+            # Сначала по строкам, затем по столбцам, чтобы не выделять лишнего
+            by_rows = values[r0] * (1 - fr)[:, np.newaxis] + values[r1] * fr[:, np.newaxis]
+            return by_rows[:, c0] * (1 - fc) + by_rows[:, c1] * fc
+        else:
+            raise ValueError(f"Неизвестный способ масштабирования: {method}")
+
+    def _interpolation_axis(self, size: int, cells: int) -> tuple:
+        """Соседние ячейки и веса интерполяции для каждого пикселя вдоль оси"""
+        position = np.clip((np.arange(size) + 0.5) / self.cell_px - 0.5, 0, cells - 1)
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, cells - 1)
+        return lower, upper, position - lower
+
+
+class HeatmapAccumulator:
+    """
+    Общая карта риска, в которую плитки прибавляются на месте
+
+    Прибавление защищено блокировкой, поэтому worker'ы могут сдавать
+    результаты прямо из фоновых потоков, без передачи массивов через сигналы
+    Qt. Плитка прибавляется в срез карты через np.add(..., out=...), новая
+    память под карту при этом не выделяется.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.values = np.zeros((height, width))
+        self.lock = threading.Lock()
+
+    def add(self, tile) -> None:
+        """Прибавляет плитку (RiskTile или SharedRiskTile) к карте"""
+        with self.lock:
+            tile.add_to(self.values)
+
+
+def encode_values(values: np.ndarray) -> bytes:
+    """Сжимает массив значений плитки (float64) через zlib"""
+    return zlib.compress(np.ascontiguousarray(values, dtype=np.float64).tobytes(), 1)
+
+
+def risk_task(obj, decay: str = 'stepwise', engine: str = 'numpy') -> dict:
+    """
+    Сериализует объект плана в словарь из простых значений и массива координат
+
+    Такой словарь дешево передается в потоки и процессы, в отличие от
+    объектов модели с вложенными Coordinate.
+
+    Args:
+        obj: объект плана
+        decay: функция убывания силы воздействия (см. risk_decay.DECAY_FUNCTIONS)
+        engine: способ расчета поля расстояний (см. DISTANCE_ENGINES)
+    """
+    return {
+        'id': obj.id,
+        'name': obj.name,
+        'type': obj.object_type.value,
+        'decay': decay,
+        'engine': engine,
+        'R1': obj.R1,
+        'R2': obj.R2,
+        'R3': obj.R3,
+        'R4': obj.R4,
+        'R5': obj.R5,
+        'R6': obj.R6,
+        'coordinates': np.array(
+            [(c.x, c.y) for c in obj.coordinates], dtype=float
+        ).reshape(-1, 2)
+    }
+
+
+def risk_cache_key(task: dict, width: int, height: int, scale_plan: float) -> str:
+    """
+    Ключ кэша вклада объекта: хэш координат, R1-R6, размеров плана,
+    масштаба и версии алгоритма расчета
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((
+        RISK_ENGINE_VERSION,
+        task['type'],
+        task['decay'],
+        task['engine'],
+        tuple(float(task[f'R{i}']) for i in range(1, 7)),
+        width,
+        height,
+        float(scale_plan or 0.0)
+    )).encode())
+    digest.update(np.ascontiguousarray(task['coordinates'], dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def influence_radius_px(task: dict, scale_plan: float) -> float:
+    """Радиус влияния объекта (R6) в пикселях плана"""
+    if not scale_plan or scale_plan <= 0:
+        raise ValueError("Масштаб плана должен быть положительным")
+    return float(task['R6']) / scale_plan
+
+
+def task_window(task: dict, width: int, height: int, scale_plan: float) -> tuple:
+    """Окно пикселей, на которые может влиять объект задачи"""
+    return object_window(task['coordinates'], influence_radius_px(task, scale_plan), width, height)
+
+
+def compute_risk_tile(task: dict, width: int, height: int, scale_plan: float) -> RiskTile:
+    """
+    Рассчитывает плитку вклада объекта в карту риска
+
+    Расстояния считаются в пикселях и переводятся в метры по масштабу
+    плана, радиусы R1-R6 задаются в метрах.
+    """
+    if task['engine'] not in DISTANCE_ENGINES:
+        raise ValueError(f"Неизвестный способ расчета расстояний: {task['engine']}")
+    radius_px = influence_radius_px(task, scale_plan)
+    window = task_window(task, width, height, scale_plan)
+    distance = DISTANCE_ENGINES[task['engine']](task['type'], task['coordinates'], window, radius_px)
+    distance *= scale_plan
+    radii = tuple(float(task[f'R{i}']) for i in range(1, 7))
+    return RiskTile(window[0], window[1], risk_values(distance, radii, task['decay']))
+
+
+def compute_risk_tile_shared(task: dict, width: int, height: int, scale_plan: float,
+                             shm_name: str) -> None:
+    """
+    Рассчитывает плитку в дочернем процессе и записывает ее в разделяемую память
+
+    Args:
+        task: объект, сериализованный функцией risk_task
+        width: ширина плана
+        height: высота плана
+        scale_plan: масштаб плана (метров в пикселе)
+        shm_name: имя блока, выделенного родителем через SharedRiskTile
+    """
+    tile = compute_risk_tile(task, width, height, scale_plan)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        values = np.ndarray(tile.values.shape, dtype=np.float64, buffer=shm.buf)
+        values[...] = tile.values
+        del values
+    finally:
+        shm.close()
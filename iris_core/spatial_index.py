@@ -0,0 +1,184 @@
+"""
+Пространственный индекс объектов плана без графического интерфейса.
+
+Геометрии объектов хранятся в дереве Shapely STRtree, поэтому поиск
+объектов в прямоугольнике, ближайшего объекта к точке и объектов
+в радиусе проходит только по ветвям дерева рядом с областью запроса,
+а не по всем объектам плана. STRtree после построения не изменяется:
+добавление и удаление объектов помечают дерево устаревшим, и оно
+перестраивается при следующем запросе.
+
+Координаты и расстояния задаются в пикселях плана; метры переводятся
+делением на масштаб плана (метров в пикселе).
+"""
+from typing import Iterable, List, Optional
+
+import numpy as np
+import shapely
+
+from iris_core.impact_zones import object_coordinates
+from iris_core.shapely_field import object_geometry
+
+
+class SpatialIndex:
+    def __init__(self, objects: Iterable = ()):
+        # Геометрии по id объекта
+        self.geometries = {}
+        self._tree = None
+        # id объектов в порядке геометрий дерева
+        self._ids = None
+        for obj in objects:
+            self.add(obj)
+
+    def __len__(self) -> int:
+        return len(self.geometries)
+
+    def __contains__(self, object_id: int) -> bool:
+        return object_id in self.geometries
+
+    def add(self, obj) -> None:
+        """Добавляет объект или заменяет его геометрию после изменения координат"""
+        coords = object_coordinates(obj)
+        if not len(coords):
+            return
+        self.geometries[obj.id] = object_geometry(obj.object_type.value, coords)
+        self._tree = None
+
+    def remove(self, object_id: int) -> None:
+        if self.geometries.pop(object_id, None) is not None:
+            self._tree = None
+
+    def geometry(self, object_id: int):
+        return self.geometries.get(object_id)
+
+    @property
+    def tree(self) -> shapely.STRtree:
+        """Дерево индекса; строится заново после изменения набора объектов"""
+        if self._tree is None:
+            self._ids = np.fromiter(self.geometries.keys(), dtype=np.int64,
+                                    count=len(self.geometries))
+            self._tree = shapely.STRtree(list(self.geometries.values()))
+        return self._tree
+
+    def _object_ids(self, indices: np.ndarray) -> List[int]:
+        return sorted(self._ids[indices].tolist())
+
+    def in_rect(self, min_x: float, min_y: float, max_x: float, max_y: float) -> List[int]:
+        """ID объектов, пересекающих прямоугольник (например, видимую область плана)"""
+        if not self.geometries:
+            return []
+        indices = self.tree.query(shapely.box(min_x, min_y, max_x, max_y),
+                                  predicate='intersects')
+        return self._object_ids(indices)
+
+    def nearest(self, x: float, y: float, max_distance: Optional[float] = None) -> Optional[int]:
+        """
+        ID объекта, ближайшего к точке
+
+        Returns:
+            Optional[int]: None, если объектов нет или все дальше max_distance
+        """
+        if not self.geometries:
+            return None
+        indices = self.tree.query_nearest(shapely.Point(x, y), max_distance=max_distance,
+                                          all_matches=False)
+        if not len(indices):
+            return None
+        return int(self._ids[indices[0]])
+
+    def within_distance(self, x: float, y: float, radius: float) -> List[int]:
+        """ID объектов не дальше radius от точки"""
+        if not self.geometries:
+            return []
+        indices = self.tree.query(shapely.Point(x, y), predicate='dwithin', distance=radius)
+        return self._object_ids(indices)
+
+    def near_object(self, object_id: int, radius: float) -> List[int]:
+        """ID других объектов не дальше radius от геометрии объекта"""
+        geometry = self.geometries.get(object_id)
+        if geometry is None:
+            return []
+        indices = self.tree.query(geometry, predicate='dwithin', distance=radius)
+        return [i for i in self._object_ids(indices) if i != object_id]
+
+    def pairs_within(self, radius: float):
+        """
+        Все пары объектов не дальше radius друг от друга
+
+        Пары ищутся одним запросом к дереву для всех геометрий, каждая пара
+        учитывается один раз, расстояния считаются одним вызовом shapely.distance.
+
+        Returns:
+            tuple: (ids1, ids2, distances) - массивы NumPy, ids1 < ids2
+        """
+        if len(self.geometries) < 2:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+        geometries = self.tree.geometries
+        first, second = self.tree.query(geometries, predicate='dwithin', distance=radius)
+        # Запрос возвращает каждую пару дважды и пару объекта с самим собой
+        ids1, ids2 = self._ids[first], self._ids[second]
+        keep = ids1 < ids2
+        first, second = first[keep], second[keep]
+        return ids1[keep], ids2[keep], shapely.distance(geometries[first], geometries[second])
+
+    def nearest_k(self, k: int) -> dict:
+        """
+        k ближайших объектов для каждого объекта
+
+        Соседи ищутся запросами dwithin с удваивающимся радиусом: объект
+        получает ответ, как только в радиусе оказывается не меньше k соседей.
+        Расстояние каждой пары считается один раз, даже если пара найдена
+        для обоих объектов.
+
+        Returns:
+            dict: {id объекта: [(id соседа, расстояние), ...]} по возрастанию расстояния
+        """
+        count = len(self.geometries)
+        k = min(k, count - 1)
+        if k <= 0:
+            return {object_id: [] for object_id in self.geometries}
+
+        tree = self.tree
+        geometries = tree.geometries
+        min_x, min_y, max_x, max_y = shapely.total_bounds(geometries)
+        # Никакие два объекта не дальше диагонали общего прямоугольника
+        diagonal = float(np.hypot(max_x - min_x, max_y - min_y))
+        # Начальный радиус - сторона квадрата, на который в среднем приходится k объектов
+        radius = max(diagonal * np.sqrt(k / count), 1.0)
+
+        sources, targets = [], []
+        pending = np.arange(count)
+        while len(pending):
+            last = radius >= diagonal
+            first, second = tree.query(geometries[pending],
+                                       predicate='dwithin', distance=min(radius, diagonal))
+            first = pending[first]
+            neighbour = first != second
+            found = np.bincount(first[neighbour], minlength=count)
+            done = np.zeros(count, dtype=bool)
+            done[pending] = last | (found[pending] >= k)
+
+            selected = neighbour & done[first]
+            sources.append(first[selected])
+            targets.append(second[selected])
+            pending = pending[~done[pending]]
+            radius *= 2
+
+        sources = np.concatenate(sources)
+        targets = np.concatenate(targets)
+
+        # Пара (a, b) и (b, a) - одно расстояние
+        keys = np.minimum(sources, targets) * count + np.maximum(sources, targets)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        unique_distances = shapely.distance(geometries[unique_keys // count],
+                                            geometries[unique_keys % count])
+        distances = unique_distances[inverse]
+
+        order = np.lexsort((distances, sources))
+        result = {object_id: [] for object_id in self.geometries}
+        for source, target, distance in zip(sources[order], targets[order], distances[order]):
+            neighbours = result[int(self._ids[source])]
+            if len(neighbours) < k:
+                neighbours.append((int(self._ids[target]), float(distance)))
+        return result
@@ -0,0 +1,192 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from iris_db.migrations import migrate
+
+# Сколько свободных подключений для чтения пул держит открытыми
+READER_POOL_SIZE = 4
+# Отображение файла базы в память и кэш страниц на подключение, байт
+MMAP_SIZE = 256 * 1024 * 1024
+CACHE_SIZE = 32 * 1024 * 1024
+
+
+class IrisConnection(sqlite3.Connection):
+    """
+    Подключение SQLite с поддержкой единицы работы
+
+    Методы репозиториев по-прежнему вызывают commit после каждой операции,
+    но внутри transaction() фиксация откладывается до выхода из самого
+    внешнего блока. Так массовые операции выполняются одной транзакцией:
+    атомарно и с одной синхронизацией с диском.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transaction_depth = 0
+
+    def commit(self):
+        if self.transaction_depth == 0:
+            super().commit()
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection):
+    """
+    Выполняет блок одной транзакцией
+
+    Вложенные блоки присоединяются к внешнему. При исключении откатываются
+    все изменения самого внешнего блока.
+
+    Для обычного sqlite3.Connection откладывать commit репозиториев нельзя,
+    поэтому блок только фиксируется или откатывается в конце.
+    """
+    if not isinstance(conn, IrisConnection):
+        with conn:
+            yield conn
+        return
+
+    if conn.transaction_depth == 0 and not conn.in_transaction:
+        # Явный BEGIN: чтения в начале блока тоже входят в транзакцию
+        conn.execute("BEGIN")
+    conn.transaction_depth += 1
+    try:
+        yield conn
+    except BaseException:
+        conn.transaction_depth -= 1
+        if conn.transaction_depth == 0:
+            conn.rollback()
+        raise
+    conn.transaction_depth -= 1
+    if conn.transaction_depth == 0:
+        conn.commit()
+
+
+def connect(db_path: str, readonly: bool = False) -> IrisConnection:
+    """Открывает подключение с настройками, общими для всех подключений к файлу"""
+    conn = sqlite3.connect(db_path, factory=IrisConnection, check_same_thread=False)
+    # Включаем поддержку foreign keys
+    conn.execute("PRAGMA foreign_keys = ON")
+    # В режиме WAL (включается пулом) NORMAL не теряет целостность базы,
+    # а commit не ждет синхронизации с диском
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    # Отрицательное значение cache_size задается в КиБ
+    conn.execute(f"PRAGMA cache_size = {-(CACHE_SIZE // 1024)}")
+    if readonly:
+        conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+class ConnectionPool:
+    """
+    Долгоживущие подключения к одному файлу базы данных
+
+    Пишущее подключение одно: его получает один поток за раз, повторный
+    запрос из того же потока (вложенный DatabaseManager) возвращает то же
+    подключение. Подключения для чтения выдаются фоновым потокам; свободные
+    возвращаются в пул, сверх READER_POOL_SIZE - закрываются. Миграции
+    схемы применяются один раз при открытии пула.
+    """
+
+    def __init__(self, db_path: str, readers: int = READER_POOL_SIZE):
+        self.db_path = db_path
+        self.max_readers = readers
+        # Подключения SQLite нельзя переносить в дочерний процесс после fork
+        self.pid = os.getpid()
+        self.closed = False
+
+        self.writer = connect(db_path)
+        # WAL сохраняется в файле базы: читатели не блокируют запись
+        # и не видят незафиксированных изменений
+        self.writer.execute("PRAGMA journal_mode = WAL")
+        migrate(self.writer)
+        self.writer_lock = threading.RLock()
+        self.writer_depth = 0
+
+        self.readers = []
+        self.lock = threading.Lock()
+
+    def acquire_writer(self) -> IrisConnection:
+        self.writer_lock.acquire()
+        self.writer_depth += 1
+        return self.writer
+
+    def release_writer(self) -> None:
+        self.writer_depth -= 1
+        if self.writer_depth == 0:
+            # Как и при закрытии подключения, незафиксированные изменения
+            # не должны достаться следующему владельцу
+            if self.writer.in_transaction and self.writer.transaction_depth == 0:
+                self.writer.rollback()
+            if self.closed:
+                self.writer.close()
+        self.writer_lock.release()
+
+    def acquire_reader(self) -> IrisConnection:
+        with self.lock:
+            if self.readers:
+                return self.readers.pop()
+        return connect(self.db_path, readonly=True)
+
+    def release_reader(self, conn: IrisConnection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self.lock:
+            if not self.closed and len(self.readers) < self.max_readers:
+                self.readers.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Закрывает свободные подключения; занятые закроются при возврате"""
+        with self.lock:
+            self.closed = True
+            readers, self.readers = self.readers, []
+        for conn in readers:
+            conn.close()
+        if self.writer_lock.acquire(blocking=False):
+            try:
+                if self.writer_depth == 0:
+                    self.writer.close()
+            finally:
+                self.writer_lock.release()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(db_path: str) -> str:
+    return os.path.normcase(os.path.abspath(db_path))
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Пул подключений к файлу; создается при первом обращении"""
+    key = _pool_key(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.closed or pool.pid != os.getpid():
+            # Пул родительского процесса не закрываем: его подключения
+            # принадлежат родителю
+            pool = ConnectionPool(db_path)
+            _pools[key] = pool
+        return pool
+
+
+def close_pool(db_path: str) -> None:
+    """Закрывает пул подключений к файлу, например при переключении базы"""
+    with _pools_lock:
+        pool = _pools.pop(_pool_key(db_path), None)
+    if pool is not None and pool.pid == os.getpid():
+        pool.close()
+
+
+def close_all_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close()
@@ -1,41 +1,77 @@
 import sqlite3
+from contextlib import contextmanager
 from typing import Optional
 from pathlib import Path
-from iris_db.schema import CREATE_TABLES_SQL
-from iris_db.repositories import ImageRepository, ObjectRepository, CoordinateRepository
+from iris_db.connection import connect, get_pool, transaction
+from iris_db.migrations import migrate
+from iris_db.repositories import (ImageRepository, ObjectRepository, CoordinateRepository,
+                                  RiskCacheRepository, PyramidRepository, BoundsRepository)
 
 
 class DatabaseManager:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, coordinate_encoding: Optional[str] = None,
+                 readonly: bool = False):
         """
-        Инициализирует подключение к базе данных и создает все необходимые таблицы
+        Получает подключение к базе данных из пула
+
+        Подключения к файлу открываются один раз и переиспользуются, схема
+        создается и мигрирует при первом подключении к файлу. close()
+        возвращает подключение в пул.
 
         Args:
             db_path: путь к файлу базы данных SQLite
+            coordinate_encoding: формат записи вершин объектов - None (строки
+                таблицы coordinates), 'float32' или 'float64' (один BLOB на объект)
+            readonly: подключение только для чтения, для фоновых потоков;
+                не ждет, пока освободится пишущее подключение
         """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
-
-        # Включаем поддержку foreign keys
-        self.conn.execute("PRAGMA foreign_keys = ON")
-
-        # Создаем таблицы
-        self._create_tables()
+        self.readonly = readonly
+        if db_path == ':memory:':
+            # Каждое подключение к :memory: - отдельная база, пул не нужен
+            self.pool = None
+            self.conn = connect(db_path)
+            self._create_tables()
+        else:
+            self.pool = get_pool(db_path)
+            self.conn = self.pool.acquire_reader() if readonly else self.pool.acquire_writer()
 
         # Инициализируем репозитории
-        self.images = ImageRepository(self.conn)
-        self.objects = ObjectRepository(self.conn)
+        self.images = ImageRepository(self.conn, coordinate_encoding)
+        self.objects = ObjectRepository(self.conn, coordinate_encoding)
         self.coordinates = CoordinateRepository(self.conn)
+        self.risk_cache = RiskCacheRepository(self.conn)
+        self.pyramids = PyramidRepository(self.conn)
+        self.bounds = BoundsRepository(self.conn)
 
     def _create_tables(self):
-        """Создает все необходимые таблицы в базе данных"""
-        cursor = self.conn.cursor()
-        cursor.executescript(CREATE_TABLES_SQL)
-        self.conn.commit()
+        """Создает таблицы и применяет недостающие миграции схемы"""
+        migrate(self.conn)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Единица работы: все операции репозиториев внутри блока фиксируются
+        одной транзакцией при выходе или откатываются при исключении
+
+            with db.transaction():
+                db.images.update(image)
+                db.pyramids.delete(image.id)
+        """
+        with transaction(self.conn):
+            yield self
 
     def close(self):
-        """Закрывает соединение с базой данных"""
-        self.conn.close()
+        """Возвращает подключение в пул (подключение к :memory: закрывается)"""
+        if self.conn is None:
+            return
+        if self.pool is None:
+            self.conn.close()
+        elif self.readonly:
+            self.pool.release_reader(self.conn)
+        else:
+            self.pool.release_writer()
+        self.conn = None
 
     def vacuum(self) -> None:
         """
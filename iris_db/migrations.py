@@ -0,0 +1,293 @@
+"""
+Версионные миграции схемы базы данных.
+
+Номер примененной миграции хранится в PRAGMA user_version файла базы.
+При открытии файла migrate() применяет по порядку все миграции с большим
+номером одной транзакцией: файл либо полностью переходит на новую схему,
+либо остается прежним. Перенос данных выполняется запросами
+INSERT ... SELECT, так что строки копируются внутри SQLite и таблицы
+не загружаются в память Python.
+
+Новая миграция добавляется в конец MIGRATIONS со следующим номером;
+CREATE_TABLES_SQL в iris_db/schema.py при этом обновляется до итоговой схемы.
+Сами миграции CREATE_TABLES_SQL не выполняют: каждая описывает свой шаг
+явно, так что файл любой версии проходит одну и ту же цепочку изменений.
+"""
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+def sql_statements(script: str) -> Iterator[str]:
+    """Разбивает SQL-скрипт на отдельные запросы"""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement.strip()
+            statement = ""
+
+
+# Схема версии 1 - таблицы и индексы на момент появления миграций.
+# Снимок не меняется вместе с CREATE_TABLES_SQL: следующие миграции
+# рассчитаны именно на эти таблицы
+SCHEMA_V1_SQL = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_name TEXT NOT NULL,
+    image_data BLOB NOT NULL,
+    scale REAL,
+    mime_type TEXT,
+    file_size BIGINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS object_types (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type_name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS objects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    image_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    R1 REAL,
+    R2 REAL,
+    R3 REAL,
+    R4 REAL,
+    R5 REAL,
+    R6 REAL,
+    object_type TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (image_id) REFERENCES images (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS coordinates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    object_id INTEGER NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    order_index INTEGER NOT NULL,
+    FOREIGN KEY (object_id) REFERENCES objects (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS packed_coordinates (
+    object_id INTEGER PRIMARY KEY,
+    encoding TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    FOREIGN KEY (object_id) REFERENCES objects (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS risk_cache (
+    object_id INTEGER PRIMARY KEY,
+    cache_key TEXT NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (object_id) REFERENCES objects (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS image_thumbnails (
+    image_id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL,
+    FOREIGN KEY (image_id) REFERENCES images (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS image_pyramids (
+    image_id INTEGER PRIMARY KEY,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    tile_size INTEGER NOT NULL,
+    levels INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (image_id) REFERENCES images (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS image_tiles (
+    image_id INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (image_id, level, col, row),
+    FOREIGN KEY (image_id) REFERENCES image_pyramids (image_id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_objects_image_id ON objects (image_id);
+CREATE INDEX IF NOT EXISTS idx_coordinates_object_order
+    ON coordinates (object_id, order_index, x, y);
+"""
+
+
+def _create_schema_v1(conn: sqlite3.Connection) -> None:
+    """Создает недостающие таблицы и индексы схемы версии 1"""
+    for statement in sql_statements(SCHEMA_V1_SQL):
+        conn.execute(statement)
+
+
+def _move_image_data_last(conn: sqlite3.Connection) -> None:
+    """
+    Переносит image_data в конец таблицы images
+
+    Без этого каталог планов и get_all, не читающие изображение, проходят
+    всю цепочку страниц BLOB ради file_size и дат.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(images)")]
+    if columns[-1] == 'image_data':
+        return
+
+    conn.execute("""
+        CREATE TABLE images_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_name TEXT NOT NULL,
+            scale REAL,
+            mime_type TEXT,
+            file_size BIGINT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            image_data BLOB NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO images_new (id, file_name, scale, mime_type, file_size,
+                                created_at, updated_at, image_data)
+        SELECT id, file_name, scale, mime_type, file_size,
+               created_at, updated_at, image_data
+        FROM images
+        ORDER BY id
+    """)
+    # Счетчик AUTOINCREMENT: id удаленных планов не должны выдаваться снова
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'images'").fetchone()
+
+    # Внешние ключи на время миграции отключены, поэтому DROP не удаляет
+    # каскадом объекты, плитки и миниатюры планов
+    conn.execute("DROP TABLE images")
+    conn.execute("ALTER TABLE images_new RENAME TO images")
+
+    if row is not None:
+        # INSERT в images_new завел счетчик только до наибольшего
+        # оставшегося id (или не завел, если планов нет)
+        cursor = conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'images'", row)
+        if cursor.rowcount == 0:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('images', ?)", row)
+
+
+def _index_object_bounds(conn: sqlite3.Connection) -> None:
+    """Создает R*Tree object_bounds и заполняет его по вершинам существующих объектов"""
+    # Импорт здесь: repositories зависит от connection, а тот - от migrations
+    from iris_db.repositories import unpack_coordinates
+
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS object_bounds USING rtree (
+            id,
+            min_x, max_x,
+            min_y, max_y,
+            +image_id INTEGER
+        )
+    """)
+    conn.execute("""
+        INSERT OR REPLACE INTO object_bounds (id, min_x, max_x, min_y, max_y, image_id)
+        SELECT c.object_id, min(c.x), max(c.x), min(c.y), max(c.y), o.image_id
+        FROM coordinates c
+        JOIN objects o ON o.id = c.object_id
+        GROUP BY c.object_id
+    """)
+
+    # Упакованные вершины разбираются в Python, курсор читает их по одной строке
+    rows = conn.execute("""
+        SELECT p.object_id, o.image_id, p.encoding, p.data
+        FROM packed_coordinates p
+        JOIN objects o ON o.id = p.object_id
+    """)
+    for object_id, image_id, encoding, data in rows:
+        coordinates = unpack_coordinates(object_id, data, encoding)
+        if not coordinates:
+            continue
+        xs = [coord.x for coord in coordinates]
+        ys = [coord.y for coord in coordinates]
+        conn.execute("""
+            INSERT OR REPLACE INTO object_bounds (id, min_x, max_x, min_y, max_y, image_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (object_id, min(xs), max(xs), min(ys), max(ys), image_id))
+
+
+def _reset_uncalibrated_scale(conn: sqlite3.Connection) -> None:
+    """
+    Сбрасывает масштаб неоткалиброванных планов в NULL
+
+    Раньше планы добавлялись с масштабом 1.0, а результат калибровки
+    в базу не записывался, поэтому 1.0 в старых файлах означает
+    "масштаб не задан", а не 1 метр в пикселе.
+    """
+    conn.execute("UPDATE images SET scale = NULL WHERE scale = 1.0")
+
+
+MIGRATIONS = [
+    Migration(1, "таблицы и индексы схемы версии 1", _create_schema_v1),
+    Migration(2, "данные изображения - последний столбец images", _move_image_data_last),
+    Migration(3, "R*Tree ограничивающих прямоугольников объектов", _index_object_bounds),
+    Migration(4, "масштаб неоткалиброванных планов - NULL", _reset_uncalibrated_scale),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Применяет к базе все миграции, которых в ней еще нет
+
+    Returns:
+        int: версия схемы после миграции
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        if version > SCHEMA_VERSION:
+            print(f"Версия схемы базы ({version}) новее поддерживаемой ({SCHEMA_VERSION})")
+        return version
+
+    # Пересоздание таблиц требует отключенных внешних ключей, а переключить
+    # их можно только вне транзакции
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        # IMMEDIATE сразу берет блокировку записи: если файл одновременно
+        # открывают несколько процессов, миграции применит только первый
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            # Старые нарушения внешних ключей в файле не должны мешать его открыть,
+            # проверяется только то, что миграции не добавили новых
+            violations_before = set(conn.execute("PRAGMA foreign_key_check").fetchall())
+            for migration in MIGRATIONS:
+                if migration.version <= version:
+                    continue
+                print(f"Миграция базы {migration.version}: {migration.description}")
+                migration.apply(conn)
+                conn.execute(f"PRAGMA user_version = {migration.version}")
+                version = migration.version
+
+            violations = set(conn.execute("PRAGMA foreign_key_check").fetchall()) - violations_before
+            if violations:
+                raise sqlite3.IntegrityError(
+                    f"Нарушены внешние ключи после миграции: {sorted(violations)[:5]}"
+                )
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+    return version
@@ -55,6 +55,64 @@ class Object:
         return False
 
 
+@dataclass
+class RiskCacheEntry:
+    """Сохраненный вклад объекта в карту риска (сжатая плитка)"""
+    object_id: int
+    cache_key: str
+    x: int
+    y: int
+    width: int
+    height: int
+    data: bytes
+    created_at: Optional[datetime] = None
+
+
+@dataclass
+class ImagePyramid:
+    """Пирамида плиток изображения плана: уровень 0 - исходный размер,
+    каждый следующий уровень вдвое меньше предыдущего"""
+    image_id: int
+    width: int
+    height: int
+    tile_size: int
+    levels: int
+    created_at: Optional[datetime] = None
+
+    def level_size(self, level: int) -> tuple:
+        """Размер изображения уровня в пикселях"""
+        factor = 2 ** level
+        return -(-self.width // factor), -(-self.height // factor)
+
+    def tile_grid(self, level: int) -> tuple:
+        """Число столбцов и строк плиток уровня"""
+        width, height = self.level_size(level)
+        return -(-width // self.tile_size), -(-height // self.tile_size)
+
+
+@dataclass
+class ImageTile:
+    """Плитка уровня пирамиды (сжатое изображение)"""
+    image_id: int
+    level: int
+    col: int
+    row: int
+    data: bytes
+
+
+@dataclass
+class ImageSummary:
+    """Краткие сведения о плане для каталога: без данных изображения и объектов"""
+    id: int
+    file_name: str
+    scale: Optional[float]
+    file_size: Optional[int]
+    object_count: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    thumbnail: Optional[bytes] = None
+
+
 @dataclass
 class Image:
     id: Optional[int]
@@ -68,7 +126,7 @@ class Image:
     updated_at: Optional[datetime] = None
 
     @classmethod
-    def from_file(cls, file_path: Union[str, Path], scale: float = 1.0) -> 'Image':
+    def from_file(cls, file_path: Union[str, Path], scale: Optional[float] = None) -> 'Image':
         """Создает объект Image из файла изображения"""
         file_path = Path(file_path)
         if not file_path.exists():
@@ -1,7 +1,41 @@
 import sqlite3
-from typing import List, Optional
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional
 from datetime import datetime
-from iris_db.models import Image, Object, Coordinate, ObjectType
+from iris_db.connection import transaction
+from iris_db.models import (Image, ImageSummary, Object, Coordinate, ObjectType,
+                            RiskCacheEntry, ImagePyramid, ImageTile)
+
+
+# Форматы упакованных координат и соответствующие коды типов array
+COORDINATE_ENCODINGS = {
+    'float32': 'f',
+    'float64': 'd',
+}
+
+
+def pack_coordinates(coordinates: List[Coordinate], encoding: str) -> bytes:
+    """Упаковывает координаты в BLOB: x0, y0, x1, y1, ... в little-endian"""
+    values = array(COORDINATE_ENCODINGS[encoding])
+    for coord in coordinates:
+        values.append(coord.x)
+        values.append(coord.y)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_coordinates(object_id: int, data: bytes, encoding: str) -> List[Coordinate]:
+    """Восстанавливает координаты из BLOB, порядок вершин задается положением в массиве"""
+    values = array(COORDINATE_ENCODINGS[encoding])
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return [
+        Coordinate(id=None, object_id=object_id, x=values[i], y=values[i + 1], order_index=i // 2)
+        for i in range(0, len(values), 2)
+    ]
 
 
 class CoordinateRepository:
@@ -18,6 +52,44 @@ class CoordinateRepository:
         self.conn.commit()
         return coordinate.id
 
+    def create_many(self, object_id: int, coordinates: List[Coordinate]) -> None:
+        """
+        Сохраняет все вершины объекта одним executemany
+
+        Транзакцию не фиксирует: commit выполняет вызывающий код, так что
+        вершины записываются вместе с объектом за одну синхронизацию с диском.
+        """
+        cursor = self.conn.cursor()
+        cursor.executemany("""
+            INSERT INTO coordinates (object_id, x, y, order_index)
+            VALUES (?, ?, ?, ?)
+        """, [(object_id, coord.x, coord.y, coord.order_index) for coord in coordinates])
+
+        # AUTOINCREMENT выдает возрастающие id, поэтому порядок id совпадает с порядком вставки
+        cursor.execute("SELECT id FROM coordinates WHERE object_id=? ORDER BY id", (object_id,))
+        for coord, row in zip(coordinates, cursor.fetchall()):
+            coord.id = row[0]
+            coord.object_id = object_id
+
+    def save_packed(self, object_id: int, coordinates: List[Coordinate], encoding: str) -> None:
+        """Сохраняет вершины объекта одним BLOB (без commit)"""
+        if encoding not in COORDINATE_ENCODINGS:
+            raise ValueError(f"Неизвестный формат координат: {encoding}")
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            INSERT OR REPLACE INTO packed_coordinates (object_id, encoding, count, data)
+            VALUES (?, ?, ?, ?)
+        """, (object_id, encoding, len(coordinates), pack_coordinates(coordinates, encoding)))
+        for coord in coordinates:
+            coord.id = None
+            coord.object_id = object_id
+
+    def delete_by_object_id(self, object_id: int) -> None:
+        """Удаляет вершины объекта в обоих форматах хранения (без commit)"""
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM coordinates WHERE object_id=?", (object_id,))
+        cursor.execute("DELETE FROM packed_coordinates WHERE object_id=?", (object_id,))
+
     def update(self, coordinate: Coordinate) -> None:
         cursor = self.conn.cursor()
         cursor.execute("""
@@ -35,6 +107,13 @@ class CoordinateRepository:
 
     def get_by_object_id(self, object_id: int) -> List[Coordinate]:
         cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT encoding, data FROM packed_coordinates WHERE object_id=?
+        """, (object_id,))
+        packed = cursor.fetchone()
+        if packed:
+            return unpack_coordinates(object_id, packed[1], packed[0])
+
         cursor.execute("""
             SELECT id, object_id, x, y, order_index
             FROM coordinates
@@ -53,11 +132,139 @@ class CoordinateRepository:
             for row in cursor.fetchall()
         ]
 
+    def get_by_image_id(self, image_id: Optional[int] = None) -> Dict[int, List[Coordinate]]:
+        """
+        Загружает вершины всех объектов плана (или всех планов, если image_id
+        не задан) двумя запросами вместо запроса на каждый объект
+
+        Returns:
+            Dict[int, List[Coordinate]]: вершины по id объекта в порядке order_index
+        """
+        condition = "WHERE o.image_id = ?" if image_id is not None else ""
+        params = (image_id,) if image_id is not None else ()
+
+        cursor = self.conn.cursor()
+        # Порядок по o.id совпадает с порядком индексов objects и coordinates,
+        # поэтому SQLite не сортирует результат отдельно
+        cursor.execute(f"""
+            SELECT c.id, c.object_id, c.x, c.y, c.order_index
+            FROM coordinates c
+            JOIN objects o ON o.id = c.object_id
+            {condition}
+            ORDER BY o.id, c.order_index
+        """, params)
+
+        coordinates = {}
+        for row in cursor.fetchall():
+            coordinates.setdefault(row[1], []).append(Coordinate(
+                id=row[0],
+                object_id=row[1],
+                x=row[2],
+                y=row[3],
+                order_index=row[4]
+            ))
+
+        # Упакованные координаты имеют приоритет, как и в get_by_object_id
+        cursor.execute(f"""
+            SELECT p.object_id, p.encoding, p.data
+            FROM packed_coordinates p
+            JOIN objects o ON o.id = p.object_id
+            {condition}
+        """, params)
+        for object_id, encoding, data in cursor.fetchall():
+            coordinates[object_id] = unpack_coordinates(object_id, data, encoding)
+
+        return coordinates
+
+
+class BoundsRepository:
+    """
+    Ограничивающие прямоугольники объектов в R*Tree object_bounds
+
+    Поиск по прямоугольнику проходит только по ветвям дерева, которые его
+    пересекают, а не по всем объектам плана. Прямоугольники хранятся
+    в float32 с округлением наружу, поэтому запросы возвращают кандидатов:
+    точное пересечение проверяется по геометрии (iris_core.spatial_index).
+    """
 
-class ObjectRepository:
     def __init__(self, conn: sqlite3.Connection):
         self.conn = conn
+
+    def save(self, object_id: int, image_id: int, coordinates: List[Coordinate]) -> None:
+        """Записывает прямоугольник вершин объекта (без commit)"""
+        xs = [coord.x for coord in coordinates]
+        ys = [coord.y for coord in coordinates]
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            INSERT OR REPLACE INTO object_bounds (id, min_x, max_x, min_y, max_y, image_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (object_id, min(xs), max(xs), min(ys), max(ys), image_id))
+
+    def delete(self, object_id: int) -> None:
+        """Удаляет прямоугольник объекта (без commit)"""
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM object_bounds WHERE id=?", (object_id,))
+
+    def delete_by_image_id(self, image_id: int) -> None:
+        """Удаляет прямоугольники всех объектов плана (без commit)"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            DELETE FROM object_bounds
+            WHERE id IN (SELECT id FROM objects WHERE image_id=?)
+        """, (image_id,))
+
+    def get_in_rect(self, image_id: int, min_x: float, min_y: float,
+                    max_x: float, max_y: float) -> List[int]:
+        """ID объектов плана, прямоугольники которых пересекают заданный"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT id FROM object_bounds
+            WHERE max_x >= ? AND min_x <= ? AND max_y >= ? AND min_y <= ?
+              AND image_id = ?
+            ORDER BY id
+        """, (min_x, max_x, min_y, max_y, image_id))
+        return [row[0] for row in cursor.fetchall()]
+
+    def get_near(self, image_id: int, x: float, y: float, radius: float) -> List[int]:
+        """ID объектов плана, прямоугольники которых ближе radius к точке по каждой оси"""
+        return self.get_in_rect(image_id, x - radius, y - radius, x + radius, y + radius)
+
+
+class ObjectRepository:
+    def __init__(self, conn: sqlite3.Connection, coordinate_encoding: Optional[str] = None):
+        self.conn = conn
         self.coordinate_repo = CoordinateRepository(conn)
+        self.bounds_repo = BoundsRepository(conn)
+        # None - вершины хранятся строками таблицы coordinates,
+        # 'float32' или 'float64' - одним BLOB на объект в packed_coordinates
+        self.coordinate_encoding = coordinate_encoding
+
+    @staticmethod
+    def _make_object(row, coordinates: List[Coordinate]) -> Object:
+        """Собирает объект из строки SELECT id, image_id, name, R1..R6, object_type, даты"""
+        return Object(
+            id=row[0],
+            image_id=row[1],
+            name=row[2],
+            R1=row[3],
+            R2=row[4],
+            R3=row[5],
+            R4=row[6],
+            R5=row[7],
+            R6=row[8],
+            object_type=ObjectType(row[9]),
+            created_at=datetime.fromisoformat(row[10]),
+            updated_at=datetime.fromisoformat(row[11]),
+            coordinates=coordinates
+        )
+
+    def _save_coordinates(self, obj: Object) -> None:
+        """Записывает вершины объекта в выбранном формате (без commit)"""
+        if self.coordinate_encoding:
+            self.coordinate_repo.save_packed(obj.id, obj.coordinates, self.coordinate_encoding)
+        else:
+            self.coordinate_repo.create_many(obj.id, obj.coordinates)
+        self.bounds_repo.save(obj.id, obj.image_id, obj.coordinates)
 
     def create(self, obj: Object) -> int:
         if not obj.validate_coordinates():
@@ -73,10 +280,8 @@ class ObjectRepository:
 
         obj.id = cursor.lastrowid
 
-        # Сохраняем координаты
-        for coord in obj.coordinates:
-            coord.object_id = obj.id
-            self.coordinate_repo.create(coord)
+        # Сохраняем координаты в той же транзакции, что и объект
+        self._save_coordinates(obj)
 
         self.conn.commit()
         return obj.id
@@ -95,14 +300,13 @@ class ObjectRepository:
               obj.R4, obj.R5, obj.R6, obj.object_type.value, obj.id))
 
         # Удаляем старые координаты и сохраняем новые
-        cursor.execute("DELETE FROM coordinates WHERE object_id=?", (obj.id,))
-        for coord in obj.coordinates:
-            coord.object_id = obj.id
-            self.coordinate_repo.create(coord)
+        self.coordinate_repo.delete_by_object_id(obj.id)
+        self._save_coordinates(obj)
 
         self.conn.commit()
 
     def delete(self, object_id: int) -> None:
+        self.bounds_repo.delete(object_id)
         cursor = self.conn.cursor()
         cursor.execute("DELETE FROM objects WHERE id=?", (object_id,))
         self.conn.commit()
@@ -122,21 +326,7 @@ class ObjectRepository:
 
         coordinates = self.coordinate_repo.get_by_object_id(row[0])
 
-        return Object(
-            id=row[0],
-            image_id=row[1],
-            name=row[2],
-            R1=row[3],
-            R2=row[4],
-            R3=row[5],
-            R4=row[6],
-            R5=row[7],
-            R6=row[8],
-            object_type=ObjectType(row[9]),
-            created_at=datetime.fromisoformat(row[10]),
-            updated_at=datetime.fromisoformat(row[11]),
-            coordinates=coordinates
-        )
+        return self._make_object(row, coordinates)
 
     def get_by_image_id(self, image_id: int) -> List[Object]:
         cursor = self.conn.cursor()
@@ -146,82 +336,102 @@ class ObjectRepository:
             FROM objects
             WHERE image_id=?
         """, (image_id,))
+        rows = cursor.fetchall()
 
-        objects = []
-        for row in cursor.fetchall():
-            coordinates = self.coordinate_repo.get_by_object_id(row[0])
-            objects.append(Object(
-                id=row[0],
-                image_id=row[1],
-                name=row[2],
-                R1=row[3],
-                R2=row[4],
-                R3=row[5],
-                R4=row[6],
-                R5=row[7],
-                R6=row[8],
-                object_type=ObjectType(row[9]),
-                created_at=datetime.fromisoformat(row[10]),
-                updated_at=datetime.fromisoformat(row[11]),
-                coordinates=coordinates
-            ))
-        return objects
+        # Вершины всех объектов плана загружаются разом, а не запросом на объект
+        coordinates = self.coordinate_repo.get_by_image_id(image_id)
+        return [self._make_object(row, coordinates.get(row[0], [])) for row in rows]
 
+    def get_all_by_image(self) -> Dict[int, List[Object]]:
+        """
+        Загружает объекты всех планов фиксированным числом запросов
 
-class ImageRepository:
-    def __init__(self, conn: sqlite3.Connection):
-        self.conn = conn
-        self.object_repo = ObjectRepository(conn)
-
-    def create(self, image: Image) -> int:
+        Returns:
+            Dict[int, List[Object]]: объекты по id плана
+        """
         cursor = self.conn.cursor()
         cursor.execute("""
-            INSERT INTO images (
-                file_name, image_data, scale, mime_type, file_size
-            ) VALUES (?, ?, ?, ?, ?)
-        """, (image.file_name, image.image_data, image.scale,
-              image.mime_type, image.file_size))
+            SELECT id, image_id, name, R1, R2, R3, R4, R5, R6,
+                   object_type, created_at, updated_at
+            FROM objects
+        """)
+        rows = cursor.fetchall()
 
-        image.id = cursor.lastrowid
+        coordinates = self.coordinate_repo.get_by_image_id()
+        objects = {}
+        for row in rows:
+            objects.setdefault(row[1], []).append(
+                self._make_object(row, coordinates.get(row[0], []))
+            )
+        return objects
 
-        # Сохраняем объекты
-        for obj in image.objects:
-            obj.image_id = image.id
-            self.object_repo.create(obj)
 
-        self.conn.commit()
+class ImageRepository:
+    def __init__(self, conn: sqlite3.Connection, coordinate_encoding: Optional[str] = None):
+        self.conn = conn
+        self.object_repo = ObjectRepository(conn, coordinate_encoding)
+
+    def create(self, image: Image) -> int:
+        # Изображение и все его объекты сохраняются одной транзакцией
+        with transaction(self.conn):
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                INSERT INTO images (
+                    file_name, image_data, scale, mime_type, file_size
+                ) VALUES (?, ?, ?, ?, ?)
+            """, (image.file_name, image.image_data, image.scale,
+                  image.mime_type, image.file_size))
+
+            image.id = cursor.lastrowid
+
+            # Сохраняем объекты
+            for obj in image.objects:
+                obj.image_id = image.id
+                self.object_repo.create(obj)
         return image.id
 
     def update(self, image: Image) -> None:
+        # Удаление, обновление и создание объектов - одна транзакция
+        with transaction(self.conn):
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                UPDATE images
+                SET file_name=?, image_data=?, scale=?, mime_type=?,
+                    file_size=?, updated_at=CURRENT_TIMESTAMP
+                WHERE id=?
+            """, (image.file_name, image.image_data, image.scale,
+                  image.mime_type, image.file_size, image.id))
+
+            # Обновляем объекты
+            existing_objects = self.object_repo.get_by_image_id(image.id)
+            existing_ids = {obj.id for obj in existing_objects if obj.id is not None}
+            new_ids = {obj.id for obj in image.objects if obj.id is not None}
+
+            # Удаляем объекты, которых нет в новом списке
+            for obj_id in existing_ids - new_ids:
+                self.object_repo.delete(obj_id)
+
+            # Обновляем или создаем объекты
+            for obj in image.objects:
+                obj.image_id = image.id
+                if obj.id is None:
+                    self.object_repo.create(obj)
+                else:
+                    self.object_repo.update(obj)
+
+    def update_scale(self, image_id: int, scale: float) -> None:
+        """Сохраняет измеренный масштаб плана (метров в пикселе)"""
         cursor = self.conn.cursor()
         cursor.execute("""
             UPDATE images
-            SET file_name=?, image_data=?, scale=?, mime_type=?,
-                file_size=?, updated_at=CURRENT_TIMESTAMP
+            SET scale=?, updated_at=CURRENT_TIMESTAMP
             WHERE id=?
-        """, (image.file_name, image.image_data, image.scale,
-              image.mime_type, image.file_size, image.id))
-
-        # Обновляем объекты
-        existing_objects = self.object_repo.get_by_image_id(image.id)
-        existing_ids = {obj.id for obj in existing_objects if obj.id is not None}
-        new_ids = {obj.id for obj in image.objects if obj.id is not None}
-
-        # Удаляем объекты, которых нет в новом списке
-        for obj_id in existing_ids - new_ids:
-            self.object_repo.delete(obj_id)
-
-        # Обновляем или создаем объекты
-        for obj in image.objects:
-            obj.image_id = image.id
-            if obj.id is None:
-                self.object_repo.create(obj)
-            else:
-                self.object_repo.update(obj)
-
+        """, (scale, image_id))
         self.conn.commit()
 
     def delete(self, image_id: int) -> None:
+        # Объекты удаляются каскадом, а R*Tree внешних ключей не поддерживает
+        self.object_repo.bounds_repo.delete_by_image_id(image_id)
         cursor = self.conn.cursor()
         cursor.execute("DELETE FROM images WHERE id=?", (image_id,))
         self.conn.commit()
@@ -262,9 +472,12 @@ class ImageRepository:
             FROM images
         """)
 
+        rows = cursor.fetchall()
+        objects_by_image = self.object_repo.get_all_by_image()
+
         images = []
-        for row in cursor.fetchall():
-            objects = self.object_repo.get_by_image_id(row[0])
+        for row in rows:
+            objects = objects_by_image.get(row[0], [])
             images.append(Image(
                 id=row[0],
                 file_name=row[1],
@@ -278,9 +491,204 @@ class ImageRepository:
             ))
         return images
 
+    def get_summaries(self, limit: Optional[int] = None, offset: int = 0) -> List[ImageSummary]:
+        """
+        Получает каталог планов: сведения о файле, число объектов и миниатюру
+
+        Объекты и координаты не загружаются, число объектов считается в SQL.
+
+        Args:
+            limit: сколько планов вернуть (None - все)
+            offset: сколько планов пропустить, для постраничной загрузки
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT i.id, i.file_name, i.scale, i.file_size, i.created_at, i.updated_at,
+                   (SELECT COUNT(*) FROM objects o WHERE o.image_id = i.id),
+                   t.data
+            FROM images i
+            LEFT JOIN image_thumbnails t ON t.image_id = i.id
+            ORDER BY i.id
+            LIMIT ? OFFSET ?
+        """, (limit if limit is not None else -1, offset))
+
+        return [
+            ImageSummary(
+                id=row[0],
+                file_name=row[1],
+                scale=row[2],
+                file_size=row[3],
+                created_at=datetime.fromisoformat(row[4]),
+                updated_at=datetime.fromisoformat(row[5]),
+                object_count=row[6],
+                thumbnail=row[7]
+            )
+            for row in cursor.fetchall()
+        ]
+
+    def get_summary(self, image_id: int) -> Optional[ImageSummary]:
+        """Получает сведения об одном плане без данных изображения и объектов"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT i.id, i.file_name, i.scale, i.file_size, i.created_at, i.updated_at,
+                   (SELECT COUNT(*) FROM objects o WHERE o.image_id = i.id),
+                   t.data
+            FROM images i
+            LEFT JOIN image_thumbnails t ON t.image_id = i.id
+            WHERE i.id=?
+        """, (image_id,))
+
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        return ImageSummary(
+            id=row[0],
+            file_name=row[1],
+            scale=row[2],
+            file_size=row[3],
+            created_at=datetime.fromisoformat(row[4]),
+            updated_at=datetime.fromisoformat(row[5]),
+            object_count=row[6],
+            thumbnail=row[7]
+        )
+
+    def save_thumbnail(self, image_id: int, data: bytes) -> None:
+        """Сохраняет миниатюру плана, заменяя прежнюю"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            INSERT OR REPLACE INTO image_thumbnails (image_id, data)
+            VALUES (?, ?)
+        """, (image_id, data))
+        self.conn.commit()
+
+    def delete_thumbnail(self, image_id: int) -> None:
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM image_thumbnails WHERE image_id=?", (image_id,))
+        self.conn.commit()
+
     def get_image_data(self, image_id: int) -> Optional[bytes]:
         """Получает только данные изображения"""
         cursor = self.conn.cursor()
         cursor.execute("SELECT image_data FROM images WHERE id=?", (image_id,))
         row = cursor.fetchone()
-        return row[0] if row else None
\ No newline at end of file
+        return row[0] if row else None
+
+    def open_image_data(self, image_id: int) -> Optional['sqlite3.Blob']:
+        """
+        Открывает данные изображения для чтения частями (Connection.blobopen)
+
+        BLOB не загружается в память целиком; его нужно закрыть до закрытия
+        подключения. Возвращает None, если плана нет.
+        """
+        try:
+            return self.conn.blobopen('images', 'image_data', image_id, readonly=True)
+        except sqlite3.OperationalError:
+            return None
+
+
+class RiskCacheRepository:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def save_many(self, entries: List[RiskCacheEntry]) -> None:
+        """Сохраняет записи кэша, заменяя прежние записи тех же объектов"""
+        cursor = self.conn.cursor()
+        cursor.executemany("""
+            INSERT OR REPLACE INTO risk_cache (
+                object_id, cache_key, x, y, width, height, data
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(e.object_id, e.cache_key, e.x, e.y, e.width, e.height, e.data)
+              for e in entries])
+        self.conn.commit()
+
+    def delete_many(self, object_ids: List[int]) -> None:
+        cursor = self.conn.cursor()
+        cursor.executemany("DELETE FROM risk_cache WHERE object_id=?",
+                           [(object_id,) for object_id in object_ids])
+        self.conn.commit()
+
+    def get_by_image_id(self, image_id: int) -> List[RiskCacheEntry]:
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT c.object_id, c.cache_key, c.x, c.y, c.width, c.height,
+                   c.data, c.created_at
+            FROM risk_cache c
+            JOIN objects o ON o.id = c.object_id
+            WHERE o.image_id = ?
+        """, (image_id,))
+
+        return [
+            RiskCacheEntry(
+                object_id=row[0],
+                cache_key=row[1],
+                x=row[2],
+                y=row[3],
+                width=row[4],
+                height=row[5],
+                data=row[6],
+                created_at=datetime.fromisoformat(row[7])
+            )
+            for row in cursor.fetchall()
+        ]
+
+
+class PyramidRepository:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def save(self, pyramid: ImagePyramid, tiles: Iterable[ImageTile]) -> None:
+        """
+        Сохраняет пирамиду плиток плана, заменяя прежнюю
+
+        Плитки могут передаваться генератором: executemany забирает их по
+        одной, и вся пирамида не держится в памяти.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM image_pyramids WHERE image_id=?", (pyramid.image_id,))
+        cursor.execute("""
+            INSERT INTO image_pyramids (image_id, width, height, tile_size, levels)
+            VALUES (?, ?, ?, ?, ?)
+        """, (pyramid.image_id, pyramid.width, pyramid.height,
+              pyramid.tile_size, pyramid.levels))
+        cursor.executemany("""
+            INSERT INTO image_tiles (image_id, level, col, row, data)
+            VALUES (?, ?, ?, ?, ?)
+        """, ((t.image_id, t.level, t.col, t.row, t.data) for t in tiles))
+        self.conn.commit()
+
+    def get(self, image_id: int) -> Optional[ImagePyramid]:
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT image_id, width, height, tile_size, levels, created_at
+            FROM image_pyramids
+            WHERE image_id=?
+        """, (image_id,))
+
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        return ImagePyramid(
+            image_id=row[0],
+            width=row[1],
+            height=row[2],
+            tile_size=row[3],
+            levels=row[4],
+            created_at=datetime.fromisoformat(row[5])
+        )
+
+    def get_tile_data(self, image_id: int, level: int, col: int, row: int) -> Optional[bytes]:
+        """Получает сжатые данные одной плитки"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT data FROM image_tiles
+            WHERE image_id=? AND level=? AND col=? AND row=?
+        """, (image_id, level, col, row))
+        result = cursor.fetchone()
+        return result[0] if result else None
+
+    def delete(self, image_id: int) -> None:
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM image_pyramids WHERE image_id=?", (image_id,))
+        self.conn.commit()
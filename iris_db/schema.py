@@ -1,13 +1,18 @@
+# Текущая схема базы - результат всех миграций из iris_db/migrations.py.
+# Базы создаются и обновляются только миграциями, этот текст описывает
+# итоговую схему и сверяется с ней в tests/test_migrations.py
 CREATE_TABLES_SQL = """
+-- Данные изображения - последний столбец: чтобы прочитать столбцы после
+-- большого BLOB, SQLite проходит всю цепочку его страниц переполнения
 CREATE TABLE IF NOT EXISTS images (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     file_name TEXT NOT NULL,
-    image_data BLOB NOT NULL,
     scale REAL,
     mime_type TEXT,
     file_size BIGINT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    image_data BLOB NOT NULL
 );
 
 CREATE TABLE IF NOT EXISTS object_types (
@@ -40,6 +45,69 @@ CREATE TABLE IF NOT EXISTS coordinates (
     FOREIGN KEY (object_id) REFERENCES objects (id) ON DELETE CASCADE
 );
 
+CREATE TABLE IF NOT EXISTS packed_coordinates (
+    object_id INTEGER PRIMARY KEY,
+    encoding TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    FOREIGN KEY (object_id) REFERENCES objects (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS risk_cache (
+    object_id INTEGER PRIMARY KEY,
+    cache_key TEXT NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (object_id) REFERENCES objects (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS image_thumbnails (
+    image_id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL,
+    FOREIGN KEY (image_id) REFERENCES images (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS image_pyramids (
+    image_id INTEGER PRIMARY KEY,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    tile_size INTEGER NOT NULL,
+    levels INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (image_id) REFERENCES images (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS image_tiles (
+    image_id INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (image_id, level, col, row),
+    FOREIGN KEY (image_id) REFERENCES image_pyramids (image_id) ON DELETE CASCADE
+);
+
+-- Ограничивающие прямоугольники объектов (R*Tree) для поиска объектов
+-- в области плана. Виртуальная таблица не удаляется каскадом вместе
+-- с объектом, строки удаляют репозитории
+CREATE VIRTUAL TABLE IF NOT EXISTS object_bounds USING rtree (
+    id,
+    min_x, max_x,
+    min_y, max_y,
+    +image_id INTEGER
+);
+
+-- Индексы внешних ключей: загрузка объектов плана и вершин объекта
+-- без полного просмотра таблиц. Индекс координат покрывающий: запросы
+-- вершин читают только его
+CREATE INDEX IF NOT EXISTS idx_objects_image_id ON objects (image_id);
+CREATE INDEX IF NOT EXISTS idx_coordinates_object_order
+    ON coordinates (object_id, order_index, x, y);
+
 -- Включаем поддержку foreign key constraints
 PRAGMA foreign_keys = ON;
 """
\ No newline at end of file
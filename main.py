@@ -18,8 +18,13 @@ from service.measurement_tools import MeasurementTools
 from service.database_handler import DatabaseHandler
 from service.edit_coordinates_manager import EditCoordinatesManager
 from service.plan_dialog import SelectPlanDialog
+from service.plan_loader import load_plan_pixmap
+from service.plan_tiles import (PlanTileSource, TiledPlanItem, TILE_CACHE_BUDGET,
+                                build_pyramid, needs_pyramid)
 from service.object_table import ObjectTableWidget
 from service.object_items import create_object_item
+from iris_core.spatial_index import SpatialIndex
+from iris_core.risk_raster import DEFAULT_UPSAMPLING
 from service.object_manager import ObjectManager
 from iris_db.models import ObjectType
 from iris_db.database import DatabaseManager
@@ -53,6 +58,9 @@ class ScaleGraphicsView(QGraphicsView):
         self.last_mouse_pos = None
         self.panning = False
 
+        # Расстояние в пикселях экрана, в пределах которого клик выбирает объект
+        self.pick_tolerance = 10
+
         # Включаем преобразования видового окна
         self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
         self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
@@ -139,7 +147,12 @@ class ScaleGraphicsView(QGraphicsView):
                 self._finish_scale_measurement()
 
     def _handle_pan_mode_click(self, event):
-        """Обработка клика в режиме перемещения"""
+        """Обработка клика в режиме перемещения, Ctrl+клик выбирает объект"""
+        if event.modifiers() & Qt.ControlModifier:
+            # Допуск задан в пикселях экрана и не зависит от масштаба вида
+            tolerance = self.pick_tolerance / self.transform().m11()
+            self.parent.pick_object(self.mapToScene(event.pos()), tolerance)
+            return
         self.panning = True
         self.last_mouse_pos = event.pos()
         self.setCursor(Qt.ClosedHandCursor)
@@ -169,11 +182,22 @@ class ScaleGraphicsView(QGraphicsView):
                 f"Масштаб: 1 пиксель = {scale:.3f} метров"
             )
             self.parent.scale_for_plan = scale
+            self._save_plan_scale(scale)
 
         self.scale_mode = False
         self.setCursor(Qt.ArrowCursor)
         self.scale_points.clear()
 
+    def _save_plan_scale(self, scale):
+        """Сохраняет масштаб в базе данных для пакетной обработки планов"""
+        if not self.parent.current_image_id or not self.parent.db_handler.current_db_path:
+            return
+        try:
+            with DatabaseManager(self.parent.db_handler.current_db_path) as db:
+                db.images.update_scale(self.parent.current_image_id, scale)
+        except Exception as e:
+            print(f"Ошибка при сохранении масштаба: {str(e)}")
+
     def mouseReleaseEvent(self, event):
         """Обработка отпускания кнопки мыши"""
         if event.button() == Qt.LeftButton and self.panning:
@@ -267,6 +291,28 @@ class MainWindow(QMainWindow):
         self.temp_line = None
         self.time_status = 10000
         self.object_items = {}
+        # Пространственный индекс объектов плана для выбора объекта кликом
+        self.spatial_index = SpatialIndex()
+        # Бэкенд расчета риска: 'thread' (QThreadPool) или 'process' (пул процессов)
+        self.risk_backend = 'thread'
+        # Убывание силы воздействия: 'stepwise', 'linear', 'exponential' или 'piecewise'
+        self.risk_decay = 'stepwise'
+        # Размер ячейки сетки риска в метрах (None - по пикселям плана)
+        # и масштабирование карты для отображения: 'nearest' или 'bilinear'
+        self.risk_cell_size = None
+        self.risk_upsampling = DEFAULT_UPSAMPLING
+        # Расчет расстояний для риска: 'numpy' или 'shapely' (массивы Shapely 2)
+        self.risk_engine = 'numpy'
+        self.risk_calculator = None
+        # Таблица расстояний: 'all' - все пары объектов, 'within' - пары не дальше
+        # distance_threshold метров, 'nearest' - distance_neighbours ближайших объектов
+        self.distance_mode = 'all'
+        self.distance_threshold = 50.0
+        self.distance_neighbours = 5
+        # Источник плиток пирамиды для больших планов (None - план показан одним QPixmap)
+        # и объем памяти под декодированные плитки в байтах
+        self.plan_tiles = None
+        self.plan_tile_cache_budget = TILE_CACHE_BUDGET
 
         # Создание основных компонентов интерфейса
         self._create_central_widget()
@@ -386,7 +432,14 @@ class MainWindow(QMainWindow):
 
             # Создаем анализатор расстояний и выполняем расчеты
             self.distance_analyzer = DistanceAnalyzer(self)
-            self.distance_analyzer.analyze_objects(objects, self.scale_for_plan)
+            if self.distance_mode == 'within':
+                self.distance_analyzer.analyze_within(objects, self.scale_for_plan,
+                                                      self.distance_threshold)
+            elif self.distance_mode == 'nearest':
+                self.distance_analyzer.analyze_nearest(objects, self.scale_for_plan,
+                                                       self.distance_neighbours)
+            else:
+                self.distance_analyzer.analyze_objects(objects, self.scale_for_plan)
 
             # Создаем диалог
             distance_dialog = QDialog(self)
@@ -421,11 +474,18 @@ class MainWindow(QMainWindow):
                         filename += '.docx'
                     try:
                         exporter = DistanceExporter()
-                        exporter.export_to_word(
-                            self.distance_analyzer.distances,
-                            objects,
-                            filename
-                        )
+                        if self.distance_analyzer.mode == 'all':
+                            exporter.export_to_word(
+                                self.distance_analyzer.distances,
+                                objects,
+                                filename
+                            )
+                        else:
+                            exporter.export_pairs_to_word(
+                                self.distance_analyzer.pairs,
+                                objects,
+                                filename
+                            )
                         self.statusBar().showMessage(
                             "Таблица успешно экспортирована",
                             3000
@@ -688,21 +748,10 @@ class MainWindow(QMainWindow):
         try:
             # Получаем данные изображения из базы
             with DatabaseManager(self.db_handler.current_db_path) as db:
-                image_data = db.images.get_image_data(self.current_image_id)
-                if not image_data:
+                # Очищаем сцену и добавляем на нее изображение плана
+                if self.show_plan(db, self.current_image_id) is None:
                     raise ValueError("План не найден в базе данных")
 
-                # Очищаем сцену
-                self.scene.clear()
-
-                # Загружаем изображение
-                pixmap = QPixmap()
-                if not pixmap.loadFromData(image_data):
-                    raise ValueError("Не удалось загрузить изображение")
-
-                # Добавляем изображение на сцену
-                self.scene.addPixmap(pixmap)
-
                 # Восстанавливаем масштаб отображения
                 self.view.fitInView(
                     self.scene.sceneRect(),
@@ -769,18 +818,24 @@ class MainWindow(QMainWindow):
 
             # Обновляем данные в базе
             with DatabaseManager(self.db_handler.current_db_path) as db:
-                # Обновляем данные изображения
-                current_image.image_data = new_image_data
-                current_image.file_name = Path(file_path).name
-                current_image.file_size = len(new_image_data)
-                current_image.mime_type, _ = mimetypes.guess_type(file_path)
-
-                # Сохраняем изменения
-                db.images.update(current_image)
-
-            # Обновляем отображение на сцене
-            self.scene.clear()
-            pixmap_item = self.scene.addPixmap(pixmap)
+                # Изображение, объекты и старая пирамида плиток заменяются
+                # одной транзакцией: вместе или не заменяются вовсе
+                with db.transaction():
+                    # Обновляем данные изображения
+                    current_image.image_data = new_image_data
+                    current_image.file_name = Path(file_path).name
+                    current_image.file_size = len(new_image_data)
+                    current_image.mime_type, _ = mimetypes.guess_type(file_path)
+
+                    # Сохраняем изменения
+                    db.images.update(current_image)
+                    # Плитки и миниатюра старого изображения больше не действительны
+                    db.pyramids.delete(self.current_image_id)
+                    db.images.delete_thumbnail(self.current_image_id)
+
+                # Обновляем отображение на сцене; новая пирамида строится
+                # после фиксации, ее плитки читает отдельное подключение
+                self.show_plan(db, self.current_image_id, pixmap.toImage())
             self.view.fitInView(
                 self.scene.sceneRect(),
                 Qt.AspectRatioMode.KeepAspectRatio
@@ -835,6 +890,7 @@ class MainWindow(QMainWindow):
 
             # Очищаем графическую сцену
             self.scene.clear()
+            self.close_plan_tiles()
 
             # Очищаем таблицу объектов
             self.object_table.clear_table()
@@ -844,6 +900,7 @@ class MainWindow(QMainWindow):
                 if item:
                     item.cleanup()
             self.object_items.clear()
+            self.spatial_index = SpatialIndex()
 
             # Сбрасываем текущий ID плана
             self.current_image_id = None
@@ -939,7 +996,8 @@ class MainWindow(QMainWindow):
         """Проверяет наличие плана на сцене"""
         if not self.scene.items():
             return True
-        pixmap_items = [item for item in self.scene.items() if isinstance(item, QGraphicsPixmapItem)]
+        pixmap_items = [item for item in self.scene.items()
+                        if isinstance(item, (QGraphicsPixmapItem, TiledPlanItem))]
         return len(pixmap_items) == 0
 
     def add_plan(self):
@@ -960,11 +1018,13 @@ class MainWindow(QMainWindow):
                 image_id = self.db_handler.save_plan(plan_name, image_data, plan_path)
 
                 if image_id:
-                    pixmap = QPixmap()
-                    pixmap.loadFromData(image_data)
+                    image = QImage()
+                    image.loadFromData(image_data)
+                    del image_data
 
-                    self.scene.clear()
-                    self.scene.addPixmap(pixmap)
+                    # Пирамида плиток большого плана строится один раз при импорте
+                    with DatabaseManager(self.db_handler.current_db_path) as db:
+                        self.show_plan(db, image_id, image)
                     self.view.fitInView(
                         self.scene.sceneRect(),
                         Qt.AspectRatioMode.KeepAspectRatio
@@ -1000,21 +1060,15 @@ class MainWindow(QMainWindow):
         """Загрузка плана из базы данных"""
         try:
             with DatabaseManager(self.db_handler.current_db_path) as db:
-                image_data = db.images.get_image_data(plan_id)
-                if image_data:
+                plan_rect = self.show_plan(db, plan_id)
+                if plan_rect is not None:
                     self.current_image_id = plan_id
 
-                    pixmap = QPixmap()
-                    pixmap.loadFromData(image_data)
-
-                    self.scene.clear()
-                    self.scene.addPixmap(pixmap)
-
                     # Сбрасываем масштаб к 100%
                     self.view.reset_scale()
 
                     # Устанавливаем сцену по размеру изображения
-                    self.scene.setSceneRect(pixmap.rect())
+                    self.scene.setSceneRect(plan_rect)
 
                     # Центрируем изображение
                     self.view.centerOn(self.scene.sceneRect().center())
@@ -1028,6 +1082,56 @@ class MainWindow(QMainWindow):
             print(f"Подробности ошибки: {e}")
 
 
+    def show_plan(self, db: DatabaseManager, image_id: int, image: QImage = None):
+        """
+        Очищает сцену и показывает на ней изображение плана
+
+        План с готовой пирамидой плиток показывается без декодирования
+        исходного изображения. Для большого плана без пирамиды она строится
+        и сохраняется в базу, остальные планы показываются одним QPixmap.
+
+        Args:
+            db: открытое подключение к базе данных
+            image_id: id плана
+            image: уже декодированное изображение плана (при импорте и замене)
+
+        Returns:
+            QRectF: границы плана на сцене или None, если план не найден
+        """
+        self.scene.clear()
+        self.close_plan_tiles()
+
+        pyramid = db.pyramids.get(image_id)
+        if pyramid is None:
+            if image is None:
+                # Изображение читается из базы частями прямо в декодер
+                pixmap = load_plan_pixmap(db, image_id)
+                if pixmap is None:
+                    return None
+                if not needs_pyramid(pixmap.width(), pixmap.height()):
+                    return QRectF(self.scene.addPixmap(pixmap).boundingRect())
+                image = pixmap.toImage()
+                del pixmap
+            elif not needs_pyramid(image.width(), image.height()):
+                return QRectF(self.scene.addPixmap(QPixmap.fromImage(image)).boundingRect())
+
+            pyramid, tiles = build_pyramid(image, image_id)
+            db.pyramids.save(pyramid, tiles)
+            print(f"Пирамида плиток плана {image_id}: {pyramid.width}x{pyramid.height}, "
+                  f"уровней {pyramid.levels}")
+
+        self.plan_tiles = PlanTileSource(self.db_handler.current_db_path, pyramid,
+                                         self.plan_tile_cache_budget)
+        item = TiledPlanItem(self.plan_tiles)
+        self.scene.addItem(item)
+        return item.boundingRect()
+
+    def close_plan_tiles(self):
+        """Закрывает источник плиток текущего плана"""
+        if self.plan_tiles:
+            self.plan_tiles.close()
+            self.plan_tiles = None
+
     def load_objects_from_image(self, image_id):
         """Загрузка объектов изображения в таблицу и создание их графических представлений"""
         try:
@@ -1051,11 +1155,19 @@ class MainWindow(QMainWindow):
                     if object_item:
                         self.object_items[obj.id] = object_item
 
+                self.spatial_index = SpatialIndex(objects)
+
         except Exception as e:
             self.statusBar().showMessage(f"Ошибка при загрузке объектов: {str(e)}", 3000)
             print(f"Подробности ошибки загрузки объектов: {e}")
 
 
+    def pick_object(self, scene_pos, tolerance: float):
+        """Выбирает в таблице объект, ближайший к точке плана"""
+        object_id = self.spatial_index.nearest(scene_pos.x(), scene_pos.y(), tolerance)
+        if object_id is None or not self.object_table.select_object(object_id):
+            self.statusBar().showMessage("Рядом с точкой нет объектов", 3000)
+
     def highlight_selected_object(self):
         """Подсветка выбранного объекта на плане"""
         try:
@@ -1078,7 +1190,8 @@ class MainWindow(QMainWindow):
         """Проверка загрузки плана"""
         if not self.current_image_id:
             return False
-        return any(isinstance(item, QGraphicsPixmapItem) for item in self.scene.items())
+        return any(isinstance(item, (QGraphicsPixmapItem, TiledPlanItem))
+                   for item in self.scene.items())
 
     def start_drawing_object(self, object_type: ObjectType):
         """Начало процесса рисования нового объекта"""
@@ -1098,6 +1211,7 @@ class MainWindow(QMainWindow):
         pixmap = QPixmap(image_path)
         if not pixmap.isNull():
             self.scene.clear()
+            self.close_plan_tiles()
             self.scene.addPixmap(pixmap)
             self.view.fitInView(self.scene.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
 
@@ -1133,6 +1247,9 @@ class MainWindow(QMainWindow):
             event: Событие закрытия
         """
         try:
+            if self.risk_calculator:
+                self.risk_calculator.cancel()
+            self.close_plan_tiles()
             if self.db_handler:
                 self.db_handler.close()
             event.accept()
@@ -2,6 +2,7 @@
 import sqlite3
 from PySide6.QtWidgets import QFileDialog
 from iris_db.database import DatabaseManager
+from iris_db.connection import close_pool
 from iris_db.models import Image, Object, Coordinate, ObjectType
 
 
@@ -24,8 +25,10 @@ class DatabaseHandler:
                 file_path += '.db'
 
             try:
-                _ = DatabaseManager(file_path)._create_tables()
-                self.current_db_path = file_path
+                # Таблицы создаются при первом подключении к файлу
+                with DatabaseManager(file_path):
+                    pass
+                self._switch_database(file_path)
                 self.connection = True
                 return True
             except Exception as e:
@@ -44,8 +47,9 @@ class DatabaseHandler:
 
         if file_path:
             try:
-                _ = DatabaseManager(file_path)
-                self.current_db_path = file_path
+                with DatabaseManager(file_path):
+                    pass
+                self._switch_database(file_path)
                 self.connection = True
                 return True
             except Exception as e:
@@ -76,7 +80,8 @@ class DatabaseHandler:
         try:
             with DatabaseManager(self.current_db_path) as db:
                 # Загружаем изображение из файла
-                image = Image.from_file(plan_path, scale=1.0)
+                # Масштаб не задан, пока план не откалиброван (update_scale)
+                image = Image.from_file(plan_path, scale=None)
                 # Сохраняем изображение в базу данных
                 image_id = db.images.create(image)
                 print(f"Created image with ID: {image_id}")
@@ -85,10 +90,17 @@ class DatabaseHandler:
             print(f"Ошибка при сохранении плана: {e}")
             return None
 
+    def _switch_database(self, file_path):
+        """Закрывает подключения к прежней базе, если открыта другая"""
+        if self.current_db_path and self.current_db_path != file_path:
+            close_pool(self.current_db_path)
+        self.current_db_path = file_path
+
     def close(self):
         """Закрывает соединение с базой данных"""
         if self.connection:
-            self.connection.close()
+            if self.current_db_path:
+                close_pool(self.current_db_path)
             self.connection = None
             self.current_db_path = None
 
@@ -3,6 +3,9 @@ from PySide6.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView, QWidg
 from PySide6.QtCore import Qt
 from iris_db.models import Object, ObjectType
 from shapely.geometry import Point, LineString, Polygon
+import numpy as np
+from iris_core.distance_matrix import DistanceMatrix, MATRIX_MEMORY_BUDGET
+from iris_core.spatial_index import SpatialIndex
 
 
 class DistanceAnalyzer:
@@ -12,6 +15,13 @@ class DistanceAnalyzer:
         self.parent = parent
         self.distances = {}  # Словарь для хранения расстояний
         self.objects = []  # Список объектов
+        # Режим анализа: 'all' - все пары, 'within' - пары не дальше порога,
+        # 'nearest' - ближайшие соседи каждого объекта
+        self.mode = 'all'
+        # Строки таблицы неполных режимов: (id объекта, id соседа, расстояние)
+        self.pairs = []
+        # Бюджет памяти на блок при расчете матрицы всех пар, байт
+        self.memory_budget = MATRIX_MEMORY_BUDGET
 
     def create_shapely_object(self, obj: Object):
         """Создает геометрический объект Shapely из объекта на плане"""
@@ -49,19 +59,83 @@ class DistanceAnalyzer:
         return pixels * scale
 
     def analyze_objects(self, objects: list, scale: float):
-        """Анализирует расстояния между всеми объектами"""
+        """
+        Анализирует расстояния между всеми объектами
+
+        Геометрия каждого объекта строится один раз, матрица считается
+        блоками через shapely.distance (iris_core.distance_matrix). distances
+        становится представлением матрицы: distances[id1][id2] - расстояние
+        в метрах, округленное до 0.1, вычисляется из нее при обращении.
+        """
         self.objects = objects
-        self.distances.clear()
-
-        # Вычисляем расстояния между всеми парами объектов
-        for i, obj1 in enumerate(objects):
-            self.distances[obj1.id] = {}
-            for j, obj2 in enumerate(objects):
-                if obj1.id == obj2.id:
-                    self.distances[obj1.id][obj2.id] = 0
-                else:
-                    distance = self.calculate_distance(obj1, obj2, scale)
-                    self.distances[obj1.id][obj2.id] = round(distance, 1)
+        self.mode = 'all'
+        self.pairs = []
+
+        geometries = np.array([self.create_shapely_object(obj) for obj in objects], dtype=object)
+        self.distances = DistanceMatrix.from_geometries(
+            [obj.id for obj in objects], geometries, factor=scale, decimals=1,
+            memory_budget=self.memory_budget
+        )
+
+    def analyze_within(self, objects: list, scale: float, max_distance: float):
+        """
+        Находит пары объектов не дальше max_distance метров друг от друга
+
+        Геометрия каждого объекта строится один раз, кандидаты отбираются
+        пространственным индексом, расстояние пары считается один раз.
+        В distances попадают только найденные пары.
+        """
+        self.objects = objects
+        self.mode = 'within'
+        self.distances = {obj.id: {} for obj in objects}
+        self.pairs = []
+
+        index = SpatialIndex(objects)
+        ids1, ids2, pixels = index.pairs_within(max_distance / scale)
+        for id1, id2, distance in zip(ids1.tolist(), ids2.tolist(), pixels.tolist()):
+            distance = round(distance * scale, 1)
+            self.distances[id1][id2] = distance
+            self.distances[id2][id1] = distance
+            self.pairs.append((id1, id2, distance))
+        self.pairs.sort(key=lambda pair: pair[2])
+
+    def analyze_nearest(self, objects: list, scale: float, k: int):
+        """
+        Находит для каждого объекта k ближайших объектов
+
+        В distances попадают расстояния до найденных соседей (в обе стороны).
+        """
+        self.objects = objects
+        self.mode = 'nearest'
+        self.distances = {obj.id: {} for obj in objects}
+        self.pairs = []
+
+        index = SpatialIndex(objects)
+        neighbours = index.nearest_k(k)
+        for obj in objects:
+            for neighbour_id, pixels in neighbours.get(obj.id, []):
+                distance = round(pixels * scale, 1)
+                self.distances[obj.id][neighbour_id] = distance
+                self.distances[neighbour_id][obj.id] = distance
+                self.pairs.append((obj.id, neighbour_id, distance))
+
+    def create_pairs_table(self) -> QTableWidget:
+        """Создает таблицу найденных пар объектов (режимы 'within' и 'nearest')"""
+        names = {obj.id: obj.name for obj in self.objects}
+        table = QTableWidget(len(self.pairs), 3)
+        second_column = "Ближайший объект" if self.mode == 'nearest' else "Объект"
+        table.setHorizontalHeaderLabels(["Объект", second_column, "Расстояние, м"])
+
+        for row, (id1, id2, distance) in enumerate(self.pairs):
+            table.setItem(row, 0, QTableWidgetItem(names[id1]))
+            table.setItem(row, 1, QTableWidgetItem(names[id2]))
+            item = QTableWidgetItem(str(distance))
+            item.setTextAlignment(Qt.AlignCenter)
+            table.setItem(row, 2, item)
+
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.verticalHeader().setVisible(False)
+        return table
 
     def create_distance_table(self) -> QTableWidget:
         """Создает таблицу с расстояниями между объектами"""
@@ -105,7 +179,10 @@ class DistanceAnalyzer:
         widget = QWidget()
         layout = QVBoxLayout(widget)
 
-        table = self.create_distance_table()
+        if self.mode == 'all':
+            table = self.create_distance_table()
+        else:
+            table = self.create_pairs_table()
         layout.addWidget(table)
 
         return widget
\ No newline at end of file
@@ -56,4 +56,37 @@ class DistanceExporter:
             cell.width = Inches(2.0)
 
         # Сохраняем документ
-        doc.save(filename)
\ No newline at end of file
+        doc.save(filename)
+
+    @staticmethod
+    def export_pairs_to_word(pairs: list, objects: list, filename: str):
+        """
+        Экспортирует список пар объектов с расстояниями в документ Word
+
+        Args:
+            pairs: строки (id объекта, id соседа, расстояние)
+            objects: список объектов
+            filename: путь для сохранения файла
+        """
+        doc = Document()
+
+        heading = doc.add_paragraph("Расстояния между объектами")
+        heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+        names = {obj.id: obj.name for obj in objects}
+        table = doc.add_table(rows=1, cols=3)
+        table.style = 'Table Grid'
+
+        for cell, title in zip(table.rows[0].cells, ("Объект", "Объект", "Расстояние, м")):
+            cell.text = title
+        # Строки добавляются по одной: table.cell() на большой таблице
+        # каждый раз заново разбирает всю ее разметку
+        for id1, id2, distance in pairs:
+            cells = table.add_row().cells
+            cells[0].text = names[id1]
+            cells[1].text = names[id2]
+            cells[2].text = str(distance)
+            for cell in cells:
+                cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
+
+        doc.save(filename)
@@ -104,6 +104,7 @@ class ObjectTableWidget(QTableWidget):
             if object_id in self.main_window.object_items:
                 self.main_window.object_items[object_id].cleanup()
                 del self.main_window.object_items[object_id]
+            self.main_window.spatial_index.remove(object_id)
 
             current_row = self.currentRow()
             self.removeRow(current_row)
@@ -189,6 +190,16 @@ class ObjectTableWidget(QTableWidget):
         elif action == delete_action:
             self.delete_selected_object()
 
+    def select_object(self, object_id: int) -> bool:
+        """Выделяет строку объекта; возвращает False, если объекта нет в таблице"""
+        for row in range(self.rowCount()):
+            id_item = self.item(row, 0)
+            if id_item and id_item.text() == str(object_id):
+                self.selectRow(row)
+                self.scrollToItem(id_item)
+                return True
+        return False
+
     def get_selected_object_id(self):
         """Возвращает ID выбранного объекта"""
         current_row = self.currentRow()
@@ -1,8 +1,218 @@
 # plan_dialog.py
-from PySide6.QtWidgets import (QDialog, QVBoxLayout, QTableWidget,
-                               QTableWidgetItem, QPushButton, QHeaderView)
-from PySide6.QtCore import Qt
+import threading
+
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QTableView,
+                               QPushButton, QHeaderView, QAbstractItemView)
+from PySide6.QtGui import QPixmap, QColor
+from PySide6.QtCore import (Qt, QAbstractTableModel, QModelIndex, QSize, QObject, Signal,
+                            QRunnable, QThreadPool, QTimer)
 from iris_db.database import DatabaseManager
+from service.plan_loader import render_plan_thumbnail, THUMBNAIL_SIZE
+
+
+def format_file_size(size) -> str:
+    """Размер файла в удобных единицах"""
+    if size is None:
+        return ""
+    if size < 1024 * 1024:
+        return f"{size / 1024:.0f} КБ"
+    return f"{size / (1024 * 1024):.1f} МБ"
+
+
+class ThumbnailSignals(QObject):
+    # id плана и миниатюра в JPEG (None, если создать ее не удалось)
+    ready = Signal(int, object)
+
+
+class ThumbnailWorker(QRunnable):
+    """
+    Создает миниатюры планов в фоновом потоке
+
+    Изображения читаются через подключение только для чтения, готовые
+    миниатюры сохраняются в базу одной транзакцией в конце.
+    """
+
+    def __init__(self, db_path: str, plan_ids: list, stopped: threading.Event):
+        super().__init__()
+        self.signals = ThumbnailSignals()
+        self.db_path = db_path
+        self.plan_ids = plan_ids
+        self.stopped = stopped
+
+    def run(self):
+        thumbnails = {}
+        try:
+            with DatabaseManager(self.db_path, readonly=True) as db:
+                for plan_id in self.plan_ids:
+                    if self.stopped.is_set():
+                        break
+                    try:
+                        data = render_plan_thumbnail(db, plan_id)
+                    except Exception as e:
+                        print(f"Ошибка при создании миниатюры плана {plan_id}: {e}")
+                        data = None
+                    if data:
+                        thumbnails[plan_id] = data
+                    self.signals.ready.emit(plan_id, data)
+
+            if thumbnails:
+                with DatabaseManager(self.db_path) as db, db.transaction():
+                    for plan_id, data in thumbnails.items():
+                        db.images.save_thumbnail(plan_id, data)
+        except Exception as e:
+            print(f"Ошибка при сохранении миниатюр планов: {e}")
+
+
+class PlanTableModel(QAbstractTableModel):
+    """
+    Каталог планов для SelectPlanDialog
+
+    Строки загружаются страницами по мере прокрутки (canFetchMore/fetchMore),
+    миниатюры декодируются только для отображаемых строк. Если у плана еще
+    нет миниатюры, строка показывает заглушку, а миниатюра создается
+    в фоновом потоке (ThumbnailWorker) и подставляется, когда готова.
+    """
+
+    COLUMNS = ["ID", "Название файла", "Объектов", "Размер",
+               "Дата создания", "Дата обновления"]
+    PAGE_SIZE = 100
+
+    def __init__(self, db_path, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.plans = []
+        self.exhausted = False
+        self.thumbnails = {}
+        # Строка плана по id - для обновления строки, когда миниатюра готова
+        self.rows = {}
+
+        self.placeholder = QPixmap(THUMBNAIL_SIZE // 2, THUMBNAIL_SIZE // 2)
+        self.placeholder.fill(QColor(230, 230, 230))
+
+        # Миниатюры, запрошенные отрисовкой таблицы: собираются за один проход
+        # отрисовки и передаются одному фоновому заданию
+        self.queued = []
+        self.requested = set()
+        self.stopped = threading.Event()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.plans)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        try:
+            with DatabaseManager(self.db_path) as db:
+                page = db.images.get_summaries(self.PAGE_SIZE, len(self.plans))
+        except Exception as e:
+            print(f"Ошибка при загрузке планов: {e}")
+            page = []
+
+        if len(page) < self.PAGE_SIZE:
+            self.exhausted = True
+        if not page:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.plans), len(self.plans) + len(page) - 1)
+        for plan in page:
+            self.rows[plan.id] = len(self.plans)
+            self.plans.append(plan)
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        plan = self.plans[index.row()]
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return str(plan.id)
+            if column == 1:
+                return plan.file_name
+            if column == 2:
+                return str(plan.object_count)
+            if column == 3:
+                return format_file_size(plan.file_size)
+            if column == 4:
+                return plan.created_at.strftime("%Y-%m-%d %H:%M:%S")
+            if column == 5:
+                return plan.updated_at.strftime("%Y-%m-%d %H:%M:%S")
+
+        elif role == Qt.ItemDataRole.DecorationRole and column == 1:
+            return self.thumbnail(plan)
+
+        elif role == Qt.ItemDataRole.TextAlignmentRole and column in (0, 2, 3):
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+        return None
+
+    def thumbnail(self, plan) -> QPixmap:
+        """Миниатюра плана; пока ее нет, возвращает заглушку и ставит миниатюру в очередь"""
+        if plan.id in self.thumbnails:
+            return self.thumbnails[plan.id]
+
+        if plan.thumbnail is None:
+            self.request_thumbnail(plan.id)
+            return self.placeholder
+
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(plan.thumbnail):
+            pixmap = None
+        self.thumbnails[plan.id] = pixmap
+        return pixmap
+
+    def request_thumbnail(self, plan_id: int) -> None:
+        if plan_id in self.requested or self.stopped.is_set():
+            return
+        self.requested.add(plan_id)
+        if not self.queued:
+            QTimer.singleShot(0, self.start_thumbnails)
+        self.queued.append(plan_id)
+
+    def start_thumbnails(self) -> None:
+        """Передает накопленные запросы миниатюр фоновому заданию"""
+        plan_ids, self.queued = self.queued, []
+        if not plan_ids or self.stopped.is_set():
+            return
+        worker = ThumbnailWorker(self.db_path, plan_ids, self.stopped)
+        worker.signals.ready.connect(self.thumbnail_ready)
+        self.thread_pool.start(worker)
+
+    def thumbnail_ready(self, plan_id: int, data) -> None:
+        row = self.rows.get(plan_id)
+        if row is None:
+            return
+        if data:
+            self.plans[row].thumbnail = data
+        else:
+            # Повторно план не декодируется, строка остается без миниатюры
+            self.thumbnails[plan_id] = None
+        index = self.index(row, 1)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    def stop(self) -> None:
+        """Останавливает создание миниатюр; вызывается при закрытии диалога"""
+        self.stopped.set()
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone()
+
+    def plan_id(self, row: int):
+        if 0 <= row < len(self.plans):
+            return self.plans[row].id
+        return None
 
 
 class SelectPlanDialog(QDialog):
@@ -16,27 +226,34 @@ class SelectPlanDialog(QDialog):
     def setup_ui(self):
         self.setWindowTitle("Выбор плана")
         self.setModal(True)
-        self.resize(600, 400)
+        self.resize(800, 500)
 
         layout = QVBoxLayout(self)
 
         # Создаем таблицу планов
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "Название файла", "Дата создания", "Дата обновления"
-        ])
+        self.model = PlanTableModel(self.db_path, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+
+        # Миниатюры показываются в колонке с названием файла
+        self.table.setIconSize(QSize(64, 64))
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(68)
 
         # Настройка размеров колонок
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
         header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
-        header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
+        for column in range(2, len(PlanTableModel.COLUMNS)):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.ResizeToContents)
         self.table.setColumnWidth(0, 50)  # Ширина колонки ID
 
         # Двойной клик по строке выбирает план
-        self.table.cellDoubleClicked.connect(self.accept)
+        self.table.doubleClicked.connect(self.accept)
 
         # Кнопка выбора
         select_button = QPushButton("Выбрать")
@@ -52,39 +269,17 @@ class SelectPlanDialog(QDialog):
         layout.addWidget(cancel_button)
 
     def load_plans(self):
-        """Загружает список планов из базы данных"""
-        try:
-            with DatabaseManager(self.db_path) as db:
-                plans = db.images.get_all()
-                self.table.setRowCount(len(plans))
-
-                for row, plan in enumerate(plans):
-                    # ID
-                    id_item = QTableWidgetItem(str(plan.id))
-                    id_item.setFlags(id_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    self.table.setItem(row, 0, id_item)
-
-                    # Название файла
-                    name_item = QTableWidgetItem(plan.file_name)
-                    name_item.setFlags(name_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    self.table.setItem(row, 1, name_item)
-
-                    # Дата создания
-                    created_item = QTableWidgetItem(plan.created_at.strftime("%Y-%m-%d %H:%M:%S"))
-                    created_item.setFlags(created_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    self.table.setItem(row, 2, created_item)
-
-                    # Дата обновления
-                    updated_item = QTableWidgetItem(plan.updated_at.strftime("%Y-%m-%d %H:%M:%S"))
-                    updated_item.setFlags(updated_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    self.table.setItem(row, 3, updated_item)
+        """Загружает первую страницу каталога планов, остальные - при прокрутке"""
+        if self.model.canFetchMore():
+            self.model.fetchMore()
 
-        except Exception as e:
-            print(f"Ошибка при загрузке планов: {e}")
+    def done(self, result):
+        self.model.stop()
+        super().done(result)
 
     def get_selected_plan_id(self):
         """Возвращает ID выбранного плана"""
-        current_row = self.table.currentRow()
-        if current_row >= 0:
-            return int(self.table.item(current_row, 0).text())
-        return None
\ No newline at end of file
+        index = self.table.currentIndex()
+        if index.isValid():
+            return self.model.plan_id(index.row())
+        return None
@@ -0,0 +1,129 @@
+# plan_loader.py
+from contextlib import contextmanager
+from typing import Optional
+
+from PySide6.QtCore import Qt, QIODevice, QBuffer, QByteArray
+from PySide6.QtGui import QPixmap, QImageReader
+
+from iris_db.database import DatabaseManager
+
+# Большая сторона миниатюры плана в каталоге и качество ее сжатия
+THUMBNAIL_SIZE = 128
+THUMBNAIL_QUALITY = 85
+
+
+class BlobDevice(QIODevice):
+    """
+    QIODevice поверх sqlite3.Blob
+
+    Декодер изображения запрашивает данные частями, и они читаются из базы
+    по мере надобности, а не загружаются целиком в bytes.
+    """
+
+    def __init__(self, blob):
+        super().__init__()
+        self.blob = blob
+        self.blob_size = len(blob)
+
+    def isSequential(self) -> bool:
+        return False
+
+    def size(self) -> int:
+        return self.blob_size
+
+    def seek(self, pos: int) -> bool:
+        if not super().seek(pos):
+            return False
+        self.blob.seek(pos)
+        return True
+
+    def readData(self, maxlen: int) -> bytes:
+        return self.blob.read(maxlen)
+
+    def writeData(self, data) -> int:
+        return -1
+
+    def close(self):
+        super().close()
+        self.blob.close()
+
+
+@contextmanager
+def plan_image_reader(db: DatabaseManager, image_id: int):
+    """
+    Открывает QImageReader над изображением плана в базе данных
+
+    BLOB читается частями через Connection.blobopen, так что исходные байты
+    не лежат в памяти целиком. Возвращает None, если план не найден.
+    """
+    if not hasattr(db.conn, 'blobopen'):
+        # Инкрементальное чтение BLOB появилось в Python 3.11
+        image_data = db.images.get_image_data(image_id)
+        if not image_data:
+            yield None
+            return
+        device = QBuffer()
+        device.setData(image_data)
+        device.open(QIODevice.OpenModeFlag.ReadOnly)
+    else:
+        blob = db.images.open_image_data(image_id)
+        if blob is None:
+            yield None
+            return
+        device = BlobDevice(blob)
+        device.open(QIODevice.OpenModeFlag.ReadOnly | QIODevice.OpenModeFlag.Unbuffered)
+
+    try:
+        yield QImageReader(device)
+    finally:
+        device.close()
+
+
+def load_plan_pixmap(db: DatabaseManager, image_id: int) -> QPixmap:
+    """
+    Загружает изображение плана из базы данных
+
+    BLOB читается частями прямо в QImageReader, так что исходные байты
+    не лежат в памяти целиком рядом с декодированным изображением и
+    освобождаются сразу после декодирования.
+
+    Returns:
+        QPixmap: изображение плана или None, если план не найден
+    """
+    with plan_image_reader(db, image_id) as reader:
+        if reader is None:
+            return None
+        pixmap = QPixmap.fromImageReader(reader)
+        if pixmap.isNull():
+            raise ValueError(f"Не удалось загрузить изображение: {reader.errorString()}")
+        return pixmap
+
+
+def render_plan_thumbnail(db: DatabaseManager, image_id: int,
+                          size: int = THUMBNAIL_SIZE) -> Optional[bytes]:
+    """
+    Создает миниатюру плана
+
+    Декодер сразу уменьшает изображение (для JPEG - при декодировании),
+    поэтому план в полном размере в памяти не создается. Миниатюра в базу
+    не записывается, так что хватает подключения только для чтения.
+
+    Returns:
+        bytes: миниатюра в JPEG или None, если план не найден
+    """
+    with plan_image_reader(db, image_id) as reader:
+        if reader is None:
+            return None
+        original = reader.size()
+        if original.isValid():
+            reader.setScaledSize(original.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            raise ValueError(f"Не удалось загрузить изображение: {reader.errorString()}")
+
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, 'JPG', THUMBNAIL_QUALITY)
+    buffer.close()
+    return bytes(data)
@@ -0,0 +1,348 @@
+# plan_tiles.py
+import math
+import threading
+from collections import OrderedDict
+
+from PySide6.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem
+from PySide6.QtGui import QImage, QPainter
+from PySide6.QtCore import Qt, QRectF, QByteArray, QBuffer, QIODevice, QRunnable, QThreadPool
+
+from iris_db.database import DatabaseManager
+from iris_db.models import ImagePyramid, ImageTile
+
+# Сторона плитки пирамиды в пикселях
+TILE_SIZE = 512
+# Планы, у которых большая сторона меньше этого размера, показываются
+# одним QPixmap: для них пирамида не дает выигрыша
+PYRAMID_MIN_SIZE = 4096
+TILE_FORMAT = 'JPG'
+TILE_QUALITY = 90
+# Объем памяти под декодированные плитки по умолчанию (около 64 плиток 512x512)
+TILE_CACHE_BUDGET = 64 * 1024 * 1024
+
+
+def needs_pyramid(width: int, height: int) -> bool:
+    """Нужна ли плану пирамида плиток"""
+    return max(width, height) >= PYRAMID_MIN_SIZE
+
+
+def build_pyramid(image: QImage, image_id: int, tile_size: int = TILE_SIZE) -> tuple:
+    """
+    Строит пирамиду плиток изображения плана
+
+    Уровень 0 - исходное изображение, каждый следующий вдвое меньше
+    предыдущего, последний уровень помещается в одну плитку.
+
+    Returns:
+        tuple: (ImagePyramid, генератор ImageTile); плитки кодируются по мере
+            чтения генератора
+    """
+    levels = 1
+    while max(image.width(), image.height()) > tile_size * 2 ** (levels - 1):
+        levels += 1
+    pyramid = ImagePyramid(image_id, image.width(), image.height(), tile_size, levels)
+
+    def tiles():
+        level_image = image
+        for level in range(levels):
+            if level > 0:
+                width, height = pyramid.level_size(level)
+                level_image = level_image.scaled(
+                    width, height,
+                    Qt.AspectRatioMode.IgnoreAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation
+                )
+            cols, rows = pyramid.tile_grid(level)
+            for row in range(rows):
+                for col in range(cols):
+                    x, y = col * tile_size, row * tile_size
+                    # Плитки на правом и нижнем краю уровня меньше стандартной
+                    tile = level_image.copy(x, y,
+                                            min(tile_size, level_image.width() - x),
+                                            min(tile_size, level_image.height() - y))
+                    yield ImageTile(image_id, level, col, row, encode_tile(tile))
+
+    return pyramid, tiles()
+
+
+def encode_tile(image: QImage) -> bytes:
+    """Сжимает плитку для хранения в базе"""
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, TILE_FORMAT, TILE_QUALITY)
+    buffer.close()
+    return bytes(data)
+
+
+def decode_tile(data: bytes) -> QImage:
+    """Декодирует плитку; QImage, в отличие от QPixmap, можно создавать вне потока интерфейса"""
+    image = QImage()
+    if data is None or not image.loadFromData(data):
+        return None
+    return image
+
+
+class TileCache:
+    """
+    LRU-кэш декодированных плиток с ограничением по объему памяти
+
+    Плитки вытесняются начиная с самой давно использованной, пока суммарный
+    размер не уложится в бюджет, поэтому память не зависит от размера плана.
+    Кэш разделяется потоком интерфейса и потоком предзагрузки.
+    """
+
+    def __init__(self, budget: int = TILE_CACHE_BUDGET):
+        self.budget = budget
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.tiles = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple) -> QImage:
+        """Возвращает плитку и отмечает ее как использованную или None"""
+        with self.lock:
+            image = self.tiles.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.tiles.move_to_end(key)
+            return image
+
+    def __contains__(self, key: tuple) -> bool:
+        with self.lock:
+            return key in self.tiles
+
+    def put(self, key: tuple, image: QImage) -> None:
+        """Добавляет плитку, вытесняя самые давно использованные"""
+        with self.lock:
+            if key in self.tiles:
+                self.size -= self.tiles.pop(key).sizeInBytes()
+            self.tiles[key] = image
+            self.size += image.sizeInBytes()
+            # Последнюю добавленную плитку не вытесняем, даже если она больше бюджета
+            while self.size > self.budget and len(self.tiles) > 1:
+                _, evicted = self.tiles.popitem(last=False)
+                self.size -= evicted.sizeInBytes()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.tiles.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        """Счетчики попаданий и промахов и занятая память"""
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'tiles': len(self.tiles),
+                'size': self.size,
+                'budget': self.budget,
+            }
+
+
+class PrefetchWorker(QRunnable):
+    """Загружает и декодирует плитки в кэш в фоновом потоке"""
+
+    def __init__(self, source: 'PlanTileSource', keys: list):
+        super().__init__()
+        self.source = source
+        self.keys = keys
+
+    def run(self):
+        try:
+            # Подключение для чтения из пула: пишущее может быть занято потоком интерфейса
+            with DatabaseManager(self.source.db_path, readonly=True) as db:
+                for key in self.keys:
+                    if self.source.closed:
+                        break
+                    if key not in self.source.cache:
+                        level, col, row = key
+                        image = decode_tile(db.pyramids.get_tile_data(
+                            self.source.pyramid.image_id, level, col, row))
+                        if image is not None:
+                            self.source.cache.put(key, image)
+        except Exception as e:
+            print(f"Ошибка предзагрузки плиток: {str(e)}")
+        finally:
+            # Плитки снимаются с очереди один раз, в том числе пропущенные
+            # после закрытия источника или ошибки
+            for key in self.keys:
+                self.source.finish_prefetch(key)
+
+
+class PlanTileSource:
+    """
+    Источник плиток пирамиды плана
+
+    Держит подключение для чтения на время показа плана. Плитки
+    декодируются по запросу и хранятся в TileCache; соседние плитки по
+    направлению прокрутки загружаются заранее в фоновом потоке.
+    """
+
+    def __init__(self, db_path: str, pyramid: ImagePyramid, cache_budget: int = TILE_CACHE_BUDGET):
+        self.db_path = db_path
+        self.pyramid = pyramid
+        self.db = DatabaseManager(db_path, readonly=True)
+        self.cache = TileCache(cache_budget)
+        self.closed = False
+        # Плитки, уже поставленные в очередь предзагрузки
+        self.pending = set()
+        self.pending_lock = threading.Lock()
+        # Один поток: предзагрузка не должна отнимать ядра у расчета риска
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+
+    def tile(self, level: int, col: int, row: int) -> QImage:
+        """Возвращает плитку уровня, загружая ее при промахе кэша"""
+        key = (level, col, row)
+        image = self.cache.get(key)
+        if image is None:
+            image = decode_tile(self.db.pyramids.get_tile_data(
+                self.pyramid.image_id, level, col, row))
+            if image is not None:
+                self.cache.put(key, image)
+        return image
+
+    def prefetch(self, level: int, tiles: list) -> None:
+        """Ставит в очередь фоновой загрузки плитки, которых еще нет в кэше"""
+        if self.closed:
+            return
+        with self.pending_lock:
+            keys = [(level, col, row) for col, row in tiles
+                    if (level, col, row) not in self.pending]
+            keys = [key for key in keys if key not in self.cache]
+            self.pending.update(keys)
+        if keys:
+            self.thread_pool.start(PrefetchWorker(self, keys))
+
+    def finish_prefetch(self, key: tuple) -> None:
+        with self.pending_lock:
+            self.pending.discard(key)
+
+    def close(self):
+        self.closed = True
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone()
+        stats = self.cache.stats()
+        print(f"Кэш плиток плана {self.pyramid.image_id}: попаданий {stats['hits']}, "
+              f"промахов {stats['misses']}, плиток {stats['tiles']}, "
+              f"{stats['size'] / 2 ** 20:.1f} из {stats['budget'] / 2 ** 20:.0f} МБ")
+        self.cache.clear()
+        self.db.close()
+
+
+class TiledPlanItem(QGraphicsItem):
+    """
+    Элемент сцены, показывающий план плитками пирамиды
+
+    Уровень пирамиды выбирается по текущему масштабу отображения: при
+    уменьшении вдвое берется уровень 1 и так далее. Рисуются и загружаются
+    только плитки, попадающие в видимую область; при прокрутке следующий
+    ряд плиток в направлении движения загружается заранее.
+    """
+
+    def __init__(self, source: PlanTileSource, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.pyramid = source.pyramid
+        # Видимый диапазон плиток при прошлой отрисовке: (уровень, столбцы, строки)
+        self.last_range = None
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+
+    def boundingRect(self) -> QRectF:
+        return QRectF(0, 0, self.pyramid.width, self.pyramid.height)
+
+    def level_for_scale(self, scale: float) -> int:
+        """Уровень пирамиды для масштаба отображения (1.0 - 100%)"""
+        if scale <= 0:
+            return self.pyramid.levels - 1
+        level = int(math.floor(math.log2(1 / scale))) if scale < 1 else 0
+        return min(max(level, 0), self.pyramid.levels - 1)
+
+    def tile_range(self, rect: QRectF, level: int) -> tuple:
+        """Диапазоны столбцов и строк плиток уровня, пересекающих прямоугольник сцены"""
+        span = self.pyramid.tile_size * 2 ** level
+        cols, rows = self.pyramid.tile_grid(level)
+        rect = rect.intersected(self.boundingRect())
+        if rect.isEmpty():
+            return None
+        col_min = max(int(rect.left() // span), 0)
+        col_max = min(int(math.ceil(rect.right() / span)), cols)
+        row_min = max(int(rect.top() // span), 0)
+        row_max = min(int(math.ceil(rect.bottom() / span)), rows)
+        return range(col_min, col_max), range(row_min, row_max)
+
+    def visible_tiles(self, rect: QRectF, level: int) -> list:
+        """Плитки уровня, пересекающие прямоугольник сцены"""
+        tile_range = self.tile_range(rect, level)
+        if tile_range is None:
+            return []
+        cols, rows = tile_range
+        return [(col, row) for row in rows for col in cols]
+
+    def neighbour_tiles(self, cols: range, rows: range, dcol: int, drow: int, level: int) -> list:
+        """Ряд плиток за границей видимого диапазона в направлении (dcol, drow)"""
+        grid_cols, grid_rows = self.pyramid.tile_grid(level)
+        tiles = set()
+        if dcol:
+            col = cols.stop if dcol > 0 else cols.start - 1
+            if 0 <= col < grid_cols:
+                tiles.update((col, row) for row in rows)
+        if drow:
+            row = rows.stop if drow > 0 else rows.start - 1
+            if 0 <= row < grid_rows:
+                tiles.update((col, row) for col in cols)
+        if dcol and drow:
+            col = cols.stop if dcol > 0 else cols.start - 1
+            row = rows.stop if drow > 0 else rows.start - 1
+            if 0 <= col < grid_cols and 0 <= row < grid_rows:
+                tiles.add((col, row))
+        return sorted(tiles)
+
+    def prefetch_neighbours(self, rect: QRectF, level: int) -> None:
+        """Запускает предзагрузку плиток в направлении прокрутки"""
+        tile_range = self.tile_range(rect, level)
+        if tile_range is None:
+            return
+        cols, rows = tile_range
+        last = self.last_range
+        self.last_range = (level, cols, rows)
+        if last is None or last[0] != level:
+            return
+        # Направление по смещению границ видимого диапазона
+        dcol = (cols.start - last[1].start) + (cols.stop - last[1].stop)
+        drow = (rows.start - last[2].start) + (rows.stop - last[2].stop)
+        if dcol or drow:
+            self.source.prefetch(level, self.neighbour_tiles(cols, rows, dcol, drow, level))
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget=None):
+        scale = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        level = self.level_for_scale(scale)
+        factor = 2 ** level
+        span = self.pyramid.tile_size * factor
+
+        painter.save()
+        # Плитки последнего столбца и строки могут выходить за план на долю пикселя уровня
+        painter.setClipRect(self.boundingRect())
+        for col, row in self.visible_tiles(option.exposedRect, level):
+            image = self.source.tile(level, col, row)
+            if image is None:
+                continue
+            target = QRectF(col * span, row * span,
+                            image.width() * factor, image.height() * factor)
+            painter.drawImage(target, image, QRectF(image.rect()))
+        painter.restore()
+
+        # Направление прокрутки определяем по видимой области вида, а не по
+        # exposedRect: при прокрутке перерисовывается только открывшаяся полоса
+        if widget is not None and widget.parentWidget() is not None:
+            view = widget.parentWidget()
+            if hasattr(view, 'mapToScene'):
+                visible = view.mapToScene(view.viewport().rect()).boundingRect()
+                self.prefetch_neighbours(visible, level)
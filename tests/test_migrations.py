@@ -0,0 +1,227 @@
+"""
+Миграции схемы и единица работы базы данных.
+
+Файл в схеме до появления миграций (user_version = 0) создается здесь
+напрямую через sqlite3, затем открывается DatabaseManager и должен
+перейти на текущую схему без потери данных.
+"""
+import sqlite3
+
+import pytest
+
+from iris_db.connection import close_all_pools
+from iris_db.database import DatabaseManager
+from iris_db.migrations import SCHEMA_VERSION
+from iris_db.models import Image, Object, Coordinate, ObjectType
+from iris_db.schema import CREATE_TABLES_SQL
+
+# Схема первых версий программы, до таблиц плиток, миниатюр и кэша риска
+BASELINE_SCHEMA_SQL = """
+CREATE TABLE images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_name TEXT NOT NULL,
+    image_data BLOB NOT NULL,
+    scale REAL,
+    mime_type TEXT,
+    file_size BIGINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE object_types (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type_name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE objects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    image_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    R1 REAL,
+    R2 REAL,
+    R3 REAL,
+    R4 REAL,
+    R5 REAL,
+    R6 REAL,
+    object_type TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (image_id) REFERENCES images (id) ON DELETE CASCADE
+);
+
+CREATE TABLE coordinates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    object_id INTEGER NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    order_index INTEGER NOT NULL,
+    FOREIGN KEY (object_id) REFERENCES objects (id) ON DELETE CASCADE
+);
+"""
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """Файл старой схемы: три плана по два объекта, план 3 удален"""
+    path = str(tmp_path / "baseline.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(BASELINE_SCHEMA_SQL)
+    for plan in range(1, 4):
+        conn.execute(
+            "INSERT INTO images (file_name, image_data, scale, mime_type, file_size) "
+            "VALUES (?, ?, ?, 'image/jpeg', 3)",
+            (f"plan{plan}.jpg", bytes([plan]) * 3, 0.5 if plan == 1 else 1.0)
+        )
+        for number in range(2):
+            cursor = conn.execute(
+                "INSERT INTO objects (image_id, name, R1, R2, R3, R4, R5, R6, object_type) "
+                "VALUES (?, ?, 1, 2, 3, 4, 5, 6, 'linear')",
+                (plan, f"object {plan}.{number}")
+            )
+            conn.executemany(
+                "INSERT INTO coordinates (object_id, x, y, order_index) VALUES (?, ?, ?, ?)",
+                [(cursor.lastrowid, 10.0 * plan, 20.0 * number + i, i) for i in range(2)]
+            )
+    conn.execute("DELETE FROM images WHERE id = 3")
+    conn.commit()
+    conn.close()
+    yield path
+    close_all_pools()
+
+
+def table_columns(conn, table: str) -> list:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def describe_schema(conn) -> dict:
+    """Таблицы со столбцами и внешними ключами, индексы с их столбцами"""
+    schema = {}
+    for name, kind in conn.execute(
+            "SELECT name, type FROM sqlite_master "
+            "WHERE type IN ('table', 'index') AND name NOT LIKE 'sqlite_%' "
+            "AND name NOT LIKE 'object_bounds_%'"):
+        if kind == 'table':
+            schema[name] = (
+                [tuple(row[1:]) for row in conn.execute(f"PRAGMA table_info({name})")],
+                sorted(tuple(row[2:]) for row in conn.execute(f"PRAGMA foreign_key_list({name})")),
+            )
+        else:
+            schema[name] = [row[2] for row in conn.execute(f"PRAGMA index_info({name})")]
+    return schema
+
+
+def test_new_database_matches_current_schema():
+    with DatabaseManager(':memory:') as db:
+        migrated = describe_schema(db.conn)
+        assert db.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+    reference = sqlite3.connect(':memory:')
+    reference.executescript(CREATE_TABLES_SQL)
+    assert migrated == describe_schema(reference)
+
+
+def test_baseline_upgrade_keeps_rows(baseline_db):
+    with DatabaseManager(baseline_db) as db:
+        conn = db.conn
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert table_columns(conn, 'images')[-1] == 'image_data'
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+
+        images = db.images.get_all()
+        assert [(image.id, image.file_name) for image in images] == [
+            (1, "plan1.jpg"),
+            (2, "plan2.jpg"),
+        ]
+        assert db.images.get_image_data(1) == b"\x01" * 3
+        assert db.images.get_image_data(2) == b"\x02" * 3
+        # Масштаб 1.0 старых файлов - неоткалиброванный план
+        assert [image.scale for image in images] == [0.5, None]
+        objects = db.objects.get_by_image_id(2)
+        assert [obj.name for obj in objects] == ["object 2.0", "object 2.1"]
+        assert [(c.x, c.y) for c in objects[1].coordinates] == [(20.0, 20.0), (20.0, 21.0)]
+        assert db.bounds.get_in_rect(2, 0, 0, 100, 100) == [obj.id for obj in objects]
+
+
+def test_baseline_upgrade_keeps_autoincrement(baseline_db):
+    with DatabaseManager(baseline_db) as db:
+        assert db.conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'images'"
+        ).fetchone() == (3,)
+        image_id = db.images.create(Image(None, "new.jpg", b"data", None, "image/jpeg", 4, []))
+        assert image_id == 4
+
+
+def test_baseline_upgrade_keeps_cascade(baseline_db):
+    with DatabaseManager(baseline_db) as db:
+        object_ids = [obj.id for obj in db.objects.get_by_image_id(1)]
+        db.images.delete(1)
+        placeholders = ", ".join("?" * len(object_ids))
+        assert db.conn.execute(
+            f"SELECT count(*) FROM objects WHERE id IN ({placeholders})", object_ids
+        ).fetchone() == (0,)
+        assert db.conn.execute(
+            f"SELECT count(*) FROM coordinates WHERE object_id IN ({placeholders})", object_ids
+        ).fetchone() == (0,)
+        assert db.bounds.get_in_rect(1, 0, 0, 100, 100) == []
+
+
+def test_migrations_run_once(baseline_db):
+    with DatabaseManager(baseline_db):
+        pass
+    close_all_pools()
+    conn = sqlite3.connect(baseline_db)
+    before = describe_schema(conn), conn.execute("SELECT count(*) FROM images").fetchone()
+    conn.close()
+
+    with DatabaseManager(baseline_db) as db:
+        assert (describe_schema(db.conn),
+                db.conn.execute("SELECT count(*) FROM images").fetchone()) == before
+
+
+def make_object(name: str) -> Object:
+    return Object(None, 0, name, 1, 2, 3, 4, 5, 6, ObjectType.POINT,
+                  [Coordinate(None, None, 1.0, 2.0, 0)])
+
+
+def test_transaction_rolls_back_all_repository_calls():
+    with DatabaseManager(':memory:') as db:
+        image_id = db.images.create(Image(None, "plan.jpg", b"data", None, "image/jpeg", 4, []))
+
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                obj = make_object("rolled back")
+                obj.image_id = image_id
+                # Каждый вызов репозитория делает commit, но внутри блока он откладывается
+                db.objects.create(obj)
+                db.images.update_scale(image_id, 0.25)
+                raise RuntimeError
+
+        assert db.objects.get_by_image_id(image_id) == []
+        assert db.images.get_by_id(image_id).scale is None
+        assert db.bounds.get_in_rect(image_id, 0, 0, 10, 10) == []
+
+
+def test_nested_transaction_joins_outer():
+    with DatabaseManager(':memory:') as db:
+        image_id = db.images.create(Image(None, "plan.jpg", b"data", None, "image/jpeg", 4, []))
+
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                with db.transaction():
+                    obj = make_object("inner")
+                    obj.image_id = image_id
+                    db.objects.create(obj)
+                # Выход из вложенного блока не фиксирует изменения
+                assert db.conn.in_transaction
+                raise RuntimeError
+
+        assert db.objects.get_by_image_id(image_id) == []
+
+        with db.transaction():
+            with db.transaction():
+                obj = make_object("committed")
+                obj.image_id = image_id
+                db.objects.create(obj)
+        assert not db.conn.in_transaction
+        assert [obj.name for obj in db.objects.get_by_image_id(image_id)] == ["committed"]